@@ -0,0 +1,21 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_jwt_extended import JWTManager
+from prometheus_flask_exporter import PrometheusMetrics
+from rate_limit import RateLimiter
+from health import HealthChecker
+import os
+import redis
+
+# Limit for routes without their own, shared by every replica (empty disables it)
+DEFAULT_RATE_LIMIT = os.environ.get('RATE_LIMIT_DEFAULT', '600/minute')
+
+# Extensions are created unbound so routes and models can import them before the app
+# exists; initialize_app() attaches them.
+database = SQLAlchemy()
+jwt_setup = JWTManager()
+metrics = PrometheusMetrics.for_app_factory()
+
+# Shared Redis for token revocation and rate limiting
+redis_client = redis.Redis(host='redis', port=6379, db=0)
+rate_limiter = RateLimiter(redis_client=redis_client, default_limits=[DEFAULT_RATE_LIMIT])
+health_checker = HealthChecker(redis_client)
@@ -0,0 +1,44 @@
+import os
+import shutil
+
+# One threaded worker per container. The two-phase-commit endpoints keep their transactions in
+# the worker's memory, so register/prepare/commit must all reach the same process.
+# Threads mostly wait: on the database, or on password hashing, which runs in the worker's own
+# process pool (PASSWORD_HASH_WORKERS, one per CPU by default) while a thread blocks on the result.
+# Keep threads within the database pool (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+
+# Import the app once in the master and fork workers from it; per-process state is set up
+# afterwards in post_worker_init
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Graceful restarts: SIGHUP reloads workers, in-flight requests get graceful_timeout to finish
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Recycle workers after this many requests (0 = never); jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+
+# Every worker writes its Prometheus metrics here and /metrics merges them.
+# Must be set before prometheus_client is imported by the app.
+multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-multiproc')
+
+# This file is read again on every SIGHUP; only the first read drops samples left by a previous run
+if os.environ.get('PROMETHEUS_MULTIPROC_OWNER') != str(os.getpid()):
+    os.environ['PROMETHEUS_MULTIPROC_OWNER'] = str(os.getpid())
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+def post_worker_init(worker):
+    from app import init_worker
+    init_worker(worker.wsgi)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from __main__ import db
+from extensions import database as db
 
 class User(db.Model):
     __tablename__ = 'users'
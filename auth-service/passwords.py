@@ -0,0 +1,92 @@
+from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from prometheus_client import Gauge, Histogram
+from extensions import metrics
+from functools import partial
+import multiprocessing
+import os
+import threading
+import time
+
+# Work factor for new hashes. Raising PASSWORD_HASH_ITERATIONS makes stored hashes
+# with fewer iterations get rehashed the next time their owner logs in.
+HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2:sha256')
+HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))
+HASH_METHOD = f'{HASH_ALGORITHM}:{HASH_ITERATIONS}'
+
+# Hashing is CPU-bound, so it runs in worker processes instead of blocking request threads.
+# At most HASH_MAX_PENDING jobs may be queued or running; further callers wait for a slot.
+HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', HASH_WORKERS * 4))
+
+hash_queue_depth = Gauge('auth_password_hash_queue_depth', 'Password hash/verify jobs queued or running',
+                         multiprocess_mode='livesum', registry=metrics.registry)
+hash_latency = Histogram('auth_password_hash_seconds', 'Password hash/verify latency including queue wait', ['operation'],
+                         registry=metrics.registry)
+
+# Request hashing and bulk imports get separate pools, so an import never queues ahead of logins
+REQUEST_POOL = 'request'
+BULK_POOL = 'bulk'
+
+_pools = {}
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(HASH_MAX_PENDING)
+
+def get_pool(name=REQUEST_POOL):
+    # Created lazily so pre-forking servers don't inherit a pool from the master process
+    with _pool_lock:
+        if name not in _pools:
+            _pools[name] = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[name]
+
+def reset_pool(name=REQUEST_POOL):
+    with _pool_lock:
+        pool = _pools.pop(name, None)
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+def run_in_pool(operation, func, *args, **kwargs):
+    start = time.perf_counter()
+    with _pending:
+        hash_queue_depth.inc()
+        try:
+            return get_pool().submit(func, *args, **kwargs).result()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next caller and finish this job here
+            reset_pool()
+            return func(*args, **kwargs)
+        finally:
+            hash_queue_depth.dec()
+            hash_latency.labels(operation).observe(time.perf_counter() - start)
+
+def hash_password(password):
+    return run_in_pool('hash', generate_password_hash, password, method=HASH_METHOD)
+
+def hash_passwords(passwords):
+    """Hash many passwords on the bulk pool, spread over its processes. Returns hashes in input order.
+
+    Meant for offline imports (the import-users command): it does not take request slots, so
+    don't call it while serving requests.
+    """
+    passwords = list(passwords)
+    if not passwords:
+        return []
+
+    hash_one = partial(generate_password_hash, method=HASH_METHOD)
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    start = time.perf_counter()
+    try:
+        return list(get_pool(BULK_POOL).map(hash_one, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        reset_pool(BULK_POOL)
+        return [hash_one(password) for password in passwords]
+    finally:
+        hash_latency.labels('hash_batch').observe(time.perf_counter() - start)
+
+def verify_password(password_hash, password):
+    return run_in_pool('verify', check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    # Werkzeug hashes look like "<method>$<salt>$<hash>"
+    return password_hash.split('$', 1)[0] != HASH_METHOD
@@ -0,0 +1,35 @@
+import os
+import threading
+import time
+
+# Under gunicorn every worker writes its metrics to PROMETHEUS_MULTIPROC_DIR and /metrics merges
+# them. Callback gauges can't be read from another process, so in that mode their callbacks are
+# sampled into plain gauge values on an interval instead. Create such gauges with
+# multiprocess_mode='livesum' so exited workers drop out of the total.
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+GAUGE_REFRESH_INTERVAL = float(os.environ.get('METRICS_GAUGE_REFRESH_INTERVAL', 5))
+
+_sampled_gauges = []
+
+def gauge_function(gauge, function):
+    """Same as gauge.set_function(function), but also works with multiprocess collection."""
+    if MULTIPROCESS:
+        _sampled_gauges.append((gauge, function))
+    else:
+        gauge.set_function(function)
+
+def refresh_gauges():
+    for gauge, function in list(_sampled_gauges):
+        try:
+            gauge.set(function())
+        except Exception as e:
+            print(f"Gauge refresh error: {str(e)}")
+
+def refresh_gauges_forever():
+    while True:
+        refresh_gauges()
+        time.sleep(GAUGE_REFRESH_INTERVAL)
+
+def start_gauge_refresher():
+    if MULTIPROCESS:
+        threading.Thread(target=refresh_gauges_forever, name='gauge-refresher', daemon=True).start()
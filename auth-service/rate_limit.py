@@ -0,0 +1,162 @@
+from flask import request, jsonify, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+import math
+import re
+import redis
+import threading
+import time
+
+# Sliding window counter shared by every replica: the previous fixed window is weighted
+# by how much of it still overlaps the sliding window. The script grants up to ARGV[3]
+# tokens at once so a replica can serve a small lease locally without asking again.
+# Leased tokens nobody uses are lost for the window, so leases only come out of the part
+# of the window above ARGV[5]; below it every token is handed out one at a time.
+# KEYS[1] current window, KEYS[2] previous window
+# ARGV[1] limit, ARGV[2] weight of the previous window, ARGV[3] tokens wanted, ARGV[4] key TTL,
+# ARGV[5] tokens never leased out
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local available = tonumber(ARGV[1]) - (math.floor(previous * tonumber(ARGV[2])) + current)
+if available <= 0 then
+    return 0
+end
+local granted = math.max(1, math.min(available - tonumber(ARGV[5]), tonumber(ARGV[3])))
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return granted
+"""
+
+RATE_LIMIT_KEY_PREFIX = 'ratelimit:'
+# Share of a limit a replica may lease at once; small limits always go to Redis
+LEASE_FRACTION = 0.05
+# Share of a limit kept out of leases, so however many processes hold unused leases,
+# at least this much of the window is still served
+LEASE_RESERVE_FRACTION = 0.5
+# Past this many local buckets, expired ones are dropped
+MAX_LOCAL_BUCKETS = 100000
+WINDOW_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+LIMIT_PATTERN = re.compile(r'^\s*(\d+)\s*(?:/|per)\s*(second|minute|hour|day)s?\s*$')
+
+class RateLimit:
+    __slots__ = ('amount', 'window', 'lease_size', 'lease_reserve', 'text')
+
+    def __init__(self, text):
+        match = LIMIT_PATTERN.match(text)
+        if not match:
+            raise ValueError(f'Invalid rate limit: {text}')
+        self.amount = int(match.group(1))
+        self.window = WINDOW_SECONDS[match.group(2)]
+        self.lease_size = max(1, int(self.amount * LEASE_FRACTION))
+        self.lease_reserve = int(self.amount * LEASE_RESERVE_FRACTION)
+        self.text = text
+
+def default_key():
+    # Authenticated callers are limited per user, everyone else per client address.
+    # remote_addr is the client's address once ProxyFix has taken it from the trusted hops of
+    # X-Forwarded-For; the header itself is client-controlled.
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if identity is not None:
+        return f'user:{identity}'
+    return f'ip:{request.remote_addr}'
+
+class RateLimiter:
+    """Per-route, per-caller sliding window limits backed by Redis, with local token leases.
+
+    Limits come from default_limits or the limit() decorator. A replica takes a lease of
+    tokens from the shared window and spends it locally; once a window is full, callers
+    are refused locally until a token could have freed up.
+    """
+
+    def __init__(self, app=None, redis_client=None, key_func=default_key, default_limits=None):
+        self.redis = redis_client
+        self.key_func = key_func
+        self.default_limits = [RateLimit(limit) for limit in default_limits or [] if limit]
+        self.leases = {}  # bucket key -> [tokens, lease expiry, blocked until]
+        self.lock = threading.Lock()
+        self.script = redis_client.register_script(SLIDING_WINDOW_SCRIPT) if redis_client else None
+        if app is not None:
+            self.init_app(app, redis_client)
+
+    def init_app(self, app, redis_client=None):
+        if redis_client is not None:
+            self.redis = redis_client
+            self.script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+        app.before_request(self.check_request)
+
+    def limit(self, *limits):
+        """Decorator replacing the default limits of a view function. Goes below the route decorator."""
+        def decorator(func):
+            func.rate_limits = [RateLimit(limit) for limit in limits]
+            return func
+        return decorator
+
+    def exempt(self, func):
+        """Decorator turning off every limit, including the defaults, for a view function."""
+        func.rate_limits = []
+        return func
+
+    def check_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        limits = getattr(view, 'rate_limits', self.default_limits)
+        if not limits:
+            return None
+
+        caller = self.key_func()
+        for limit in limits:
+            bucket = f'{request.endpoint}:{limit.amount}/{limit.window}:{caller}'
+            retry_after = self.acquire(bucket, limit)
+            if retry_after:
+                response = jsonify({'message': f'Too many requests, limit is {limit.text}'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response
+        return None
+
+    def acquire(self, bucket, limit):
+        """Take one token for bucket. Returns 0 if allowed, otherwise seconds until a retry may succeed."""
+        now = time.time()
+        with self.lock:
+            lease = self.leases.get(bucket)
+            if lease:
+                tokens, expires_at, blocked_until = lease
+                if now < blocked_until:
+                    return blocked_until - now
+                if tokens > 0 and now < expires_at:
+                    lease[0] -= 1
+                    return 0
+
+        window_index = int(now // limit.window)
+        window_end = (window_index + 1) * limit.window
+        previous_weight = 1 - (now % limit.window) / limit.window
+        try:
+            granted = int(self.script(
+                keys=[f'{RATE_LIMIT_KEY_PREFIX}{bucket}:{window_index}',
+                      f'{RATE_LIMIT_KEY_PREFIX}{bucket}:{window_index - 1}'],
+                args=[limit.amount, previous_weight, limit.lease_size, limit.window * 2, limit.lease_reserve]
+            ))
+        except redis.RedisError:
+            # Don't take the service down with the limiter
+            return 0
+
+        with self.lock:
+            if len(self.leases) > MAX_LOCAL_BUCKETS:
+                self.prune(now)
+            if granted > 0:
+                # The lease is only good until the current window ends
+                self.leases[bucket] = [granted - 1, window_end, 0]
+                return 0
+            # Full: roughly one token frees up every window/amount seconds
+            blocked_until = now + max(0.05, limit.window / limit.amount)
+            self.leases[bucket] = [0, window_end, blocked_until]
+            return blocked_until - now
+
+    def prune(self, now):
+        expired = [bucket for bucket, (_, expires_at, blocked_until) in self.leases.items()
+                   if expires_at <= now and blocked_until <= now]
+        for bucket in expired:
+            del self.leases[bucket]
@@ -1,39 +1,316 @@
-from flask import request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from models.users import User
-from __main__ import application as app_instance, database as db_instance, rate_limiter as limiter
-from sqlalchemy import text
+from passwords import hash_password, hash_passwords, verify_password, needs_rehash
+from token_denylist import revoke_token
+from extensions import database as db_instance, rate_limiter as limiter, metrics, health_checker
+from sqlalchemy import text, insert, or_
+from sqlalchemy.exc import IntegrityError
+from prometheus_client import Gauge
+from process_metrics import gauge_function
+from collections import OrderedDict
+import click
+import fcntl
+import json
+import os
+import threading
 import time
 import uuid
 
+auth_routes = Blueprint('auth', __name__, cli_group=None)
+
+# Transaction store limits. Finished transactions are kept briefly for status queries;
+# pending/prepared ones that nobody resolves are aborted after TRANSACTION_ACTIVE_TTL.
+TRANSACTION_LOG_PATH = os.environ.get('TRANSACTION_LOG_PATH', 'transactions.log')
+TRANSACTION_LOG_COMPACT_LINES = int(os.environ.get('TRANSACTION_LOG_COMPACT_LINES', 10000))
+TRANSACTION_MAX_FINISHED = int(os.environ.get('TRANSACTION_MAX_FINISHED', 10000))
+TRANSACTION_FINISHED_TTL = int(os.environ.get('TRANSACTION_FINISHED_TTL', 600))
+TRANSACTION_ACTIVE_TTL = int(os.environ.get('TRANSACTION_ACTIVE_TTL', 3600))
+TRANSACTION_MAX_LOGS = 20
+# Each worker process logs to its own file, picked by locking the first free slot
+TRANSACTION_LOG_SLOTS = 64
+FINISHED_STATUSES = ('COMMITTED', 'ABORTED', 'FAILED')
+# Request fields that must never reach the transaction log
+SENSITIVE_FIELDS = ('password', 'confirm_password')
+
+# Bulk user import (import-users command): rows are validated, checked and inserted one chunk at a time
+USER_IMPORT_CHUNK_SIZE = 1000
+USERNAME_MAX_LENGTH = 50
+EMAIL_MAX_LENGTH = 100
+
+# Upper bounds on how many ids a single batch lookup may resolve
+USER_LOOKUP_MAX_IDS_QUERY = 200
+USER_LOOKUP_MAX_IDS_BODY = 10000
+
+def lookup_public_profiles(user_ids):
+    # Resolve every id with a single WHERE id IN (...) query
+    rows = db_instance.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all() if user_ids else []
+    found = {row.id for row in rows}
+
+    return jsonify({
+        'users': [{'id': row.id, 'username': row.username} for row in rows],
+        'missing': sorted(set(user_ids) - found)
+    }), 200
+
+def parse_import_line(line):
+    # Returns (user, None) for a usable row or (None, reason) for a rejected one
+    try:
+        user = json.loads(line)
+    except ValueError:
+        return None, 'Invalid JSON'
+
+    if not isinstance(user, dict):
+        return None, 'Row must be a JSON object'
+    if not all(isinstance(user.get(field), str) and user.get(field) for field in ('username', 'email', 'password')):
+        return None, 'Missing required fields'
+    if len(user['username']) > USERNAME_MAX_LENGTH or len(user['email']) > EMAIL_MAX_LENGTH:
+        return None, 'Username or email too long'
+    return user, None
+
+def import_user_chunk(chunk, seen_usernames, seen_emails, rejected):
+    # chunk holds (line_number, user) pairs; returns how many users were inserted
+    usernames = [user['username'] for _, user in chunk]
+    emails = [user['email'] for _, user in chunk]
+
+    # One query finds every clash with existing accounts for the whole chunk
+    taken = db_instance.session.query(User.username, User.email) \
+        .filter(or_(User.username.in_(usernames), User.email.in_(emails))) \
+        .all()
+    taken_usernames = {row.username for row in taken}
+    taken_emails = {row.email for row in taken}
+
+    accepted = []
+    for line_number, user in chunk:
+        if user['username'] in taken_usernames or user['username'] in seen_usernames:
+            rejected.append({'line': line_number, 'message': 'Username already taken'})
+        elif user['email'] in taken_emails or user['email'] in seen_emails:
+            rejected.append({'line': line_number, 'message': 'Email already in use'})
+        else:
+            seen_usernames.add(user['username'])
+            seen_emails.add(user['email'])
+            accepted.append((line_number, user))
+
+    if not accepted:
+        return 0
+
+    password_hashes = hash_passwords(user['password'] for _, user in accepted)
+    rows = [
+        {'username': user['username'], 'email': user['email'], 'password': password_hash}
+        for (_, user), password_hash in zip(accepted, password_hashes)
+    ]
+
+    try:
+        db_instance.session.execute(insert(User), rows)
+        db_instance.session.commit()
+        return len(rows)
+    except IntegrityError:
+        # Someone registered a clashing account meanwhile; fall back to row-by-row to find it
+        db_instance.session.rollback()
+
+    created = 0
+    for (line_number, _), row in zip(accepted, rows):
+        try:
+            db_instance.session.execute(insert(User), [row])
+            db_instance.session.commit()
+            created += 1
+        except IntegrityError:
+            db_instance.session.rollback()
+            rejected.append({'line': line_number, 'message': 'Username or email already in use'})
+    return created
+
+def import_users(lines):
+    """Register users from an iterable of JSONL lines. Returns (created_count, rejected_rows)."""
+    created = 0
+    rejected = []
+    seen_usernames = set()
+    seen_emails = set()
+    chunk = []
+
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+
+        user, reason = parse_import_line(line)
+        if reason:
+            rejected.append({'line': line_number, 'message': reason})
+            continue
+
+        chunk.append((line_number, user))
+        if len(chunk) >= USER_IMPORT_CHUNK_SIZE:
+            created += import_user_chunk(chunk, seen_usernames, seen_emails, rejected)
+            chunk = []
+
+    if chunk:
+        created += import_user_chunk(chunk, seen_usernames, seen_emails, rejected)
+
+    rejected.sort(key=lambda row: row['line'])
+    return created, rejected
+
+class TransactionRecord:
+    # Slots keep the per-transaction footprint small; prepared_data only holds plain values, never ORM objects
+    __slots__ = ('id', 'operation', 'data', 'status', 'prepared_data', 'created_at', 'updated_at', 'logs')
+
+    def __init__(self, transaction_id, operation, data, status='PENDING', prepared_data=None, created_at=None):
+        self.id = transaction_id
+        self.operation = operation
+        self.data = data
+        self.status = status
+        self.prepared_data = prepared_data
+        self.created_at = created_at or time.time()
+        self.updated_at = time.time()
+        self.logs = []
+
+    def log(self, message):
+        self.logs.append(message)
+        if len(self.logs) > TRANSACTION_MAX_LOGS:
+            del self.logs[0]
+        self.updated_at = time.time()
+
+    def to_log_entry(self):
+        return {
+            'id': self.id,
+            'operation': self.operation,
+            'status': self.status,
+            'data': {key: value for key, value in self.data.items() if key not in SENSITIVE_FIELDS},
+            'prepared_data': self.prepared_data,
+            'created_at': self.created_at
+        }
+
+def claim_log_path(base_path):
+    """Return a transaction log path no other live process is using, holding its lock file open.
+
+    Slot 0 is base_path itself. A restarted worker takes over the slot its predecessor released,
+    together with the prepared transactions in that log.
+    """
+    for slot in range(TRANSACTION_LOG_SLOTS):
+        log_path = base_path if slot == 0 else f'{base_path}.{slot}'
+        lock_file = open(f'{log_path}.lock', 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            continue
+        return log_path, lock_file
+    raise RuntimeError(f'All {TRANSACTION_LOG_SLOTS} transaction log slots are in use')
+
 class TransactionManager:
-    def __init__(self):
-        self.transactions = {}
-    
+    def __init__(self, log_path=TRANSACTION_LOG_PATH):
+        # Both ordered by last update, so the oldest entries are always at the front
+        self.active = OrderedDict()
+        self.finished = OrderedDict()
+        self.lock = threading.Lock()
+        self.log_path, self.log_lock_file = claim_log_path(log_path)
+        self.log_file = None
+        self.log_lines = 0
+        self.recover()
+
+    # Persistence: only transactions that reach PREPARED are written to the append-only log,
+    # once when prepared and once when resolved, so a restart can still commit or abort them.
+
+    def recover(self):
+        latest = {}
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as log_file:
+                for line in log_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-write
+                        continue
+                    latest[entry['id']] = entry
+
+        for entry in latest.values():
+            if entry['status'] != 'PREPARED':
+                continue
+            transaction = TransactionRecord(entry['id'], entry['operation'], entry['data'], entry['status'],
+                                            entry['prepared_data'], entry['created_at'])
+            transaction.log(f'Recovered at {time.time()}')
+            self.active[transaction.id] = transaction
+
+        self.compact()
+
+    def compact(self):
+        # Rewrite the log with only the transactions that are still prepared
+        temp_path = f'{self.log_path}.tmp'
+        with open(temp_path, 'w') as temp_file:
+            for transaction in self.active.values():
+                if transaction.status == 'PREPARED':
+                    temp_file.write(json.dumps(transaction.to_log_entry()) + '\n')
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, self.log_path)
+
+        if self.log_file:
+            self.log_file.close()
+        self.log_file = open(self.log_path, 'a')
+        self.log_lines = sum(1 for transaction in self.active.values() if transaction.status == 'PREPARED')
+
+    def persist(self, transaction):
+        self.log_file.write(json.dumps(transaction.to_log_entry()) + '\n')
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+        self.log_lines += 1
+        if self.log_lines > TRANSACTION_LOG_COMPACT_LINES:
+            self.compact()
+
+    def evict(self):
+        now = time.time()
+        while self.finished:
+            transaction = next(iter(self.finished.values()))
+            if len(self.finished) <= TRANSACTION_MAX_FINISHED and now - transaction.updated_at < TRANSACTION_FINISHED_TTL:
+                break
+            self.finished.popitem(last=False)
+
+        # Abandoned transactions are aborted so they can't pin memory (or a log entry) forever
+        while self.active:
+            transaction = next(iter(self.active.values()))
+            if now - transaction.updated_at < TRANSACTION_ACTIVE_TTL:
+                break
+            self.set_status(transaction, 'ABORTED', f'Expired at {now}')
+
+    def set_status(self, transaction, status, message):
+        was_prepared = transaction.status == 'PREPARED'
+        transaction.status = status
+        transaction.log(message)
+
+        if status in FINISHED_STATUSES:
+            self.active.pop(transaction.id, None)
+            self.finished[transaction.id] = transaction
+            self.finished.move_to_end(transaction.id)
+            # Nothing is left to do for a finished transaction, so drop the plain-text payload
+            transaction.data = {}
+            transaction.prepared_data = None
+        else:
+            self.active.move_to_end(transaction.id)
+
+        if status == 'PREPARED' or was_prepared:
+            self.persist(transaction)
+
+    def get(self, transaction_id):
+        return self.active.get(transaction_id) or self.finished.get(transaction_id)
+
     def create_transaction(self, operation, data):
         transaction_id = str(uuid.uuid4())
-        self.transactions[transaction_id] = {
-            'id': transaction_id,
-            'operation': operation,
-            'data': data,
-            'status': 'PENDING',
-            'prepared_data': None,
-            'created_at': time.time(),
-            'logs': []
-        }
+        with self.lock:
+            self.evict()
+            self.active[transaction_id] = TransactionRecord(transaction_id, operation, data)
         return transaction_id
     
     def prepare_transaction(self, transaction_id):
-        transaction = self.transactions.get(transaction_id)
+        transaction = self.get(transaction_id)
         if not transaction:
             raise ValueError('Transaction not found')
         
+        if transaction.status in FINISHED_STATUSES:
+            return False, f'Transaction already {transaction.status.lower()}'
+        
         # Validate data based on operation
-        if transaction['operation'] == 'register':
+        if transaction.operation == 'register':
             # Perform pre-commit checks for registration
-            username = transaction['data'].get('username')
-            email = transaction['data'].get('email')
+            username = transaction.data.get('username')
+            email = transaction.data.get('email')
             
             if User.query.filter_by(username=username).first():
                 return False, 'Username already taken'
@@ -42,26 +319,23 @@ class TransactionManager:
                 return False, 'Email already in use'
             
             # Store prepared data
-            transaction['prepared_data'] = {
+            transaction.prepared_data = {
                 'username': username,
                 'email': email,
-                'password_hash': generate_password_hash(
-                    transaction['data'].get('password'), 
-                    method='pbkdf2:sha256'
-                )
+                'password_hash': hash_password(transaction.data.get('password'))
             }
         
-        elif transaction['operation'] == 'update':
-            user_id = transaction['data'].get('user_id')
+        elif transaction.operation == 'update':
+            user_id = transaction.data.get('user_id')
             user_to_update = User.query.get(user_id)
             
             if not user_to_update:
                 return False, 'User not found'
             
             # Validate new data
-            new_username = transaction['data'].get('username')
-            new_email = transaction['data'].get('email')
-            new_password = transaction['data'].get('password')
+            new_username = transaction.data.get('username')
+            new_email = transaction.data.get('email')
+            new_password = transaction.data.get('password')
             
             if new_username and User.query.filter_by(username=new_username).first():
                 return False, 'Username already in use'
@@ -70,40 +344,40 @@ class TransactionManager:
                 return False, 'Email already in use'
             
             # Store prepared update data
-            transaction['prepared_data'] = {
-                'user': user_to_update,
+            transaction.prepared_data = {
+                'user_id': user_to_update.id,
                 'new_username': new_username,
                 'new_email': new_email,
-                'new_password_hash': generate_password_hash(new_password, method='pbkdf2:sha256') if new_password else None
+                'new_password_hash': hash_password(new_password) if new_password else None
             }
         
-        elif transaction['operation'] == 'delete':
-            user_id = transaction['data'].get('user_id')
+        elif transaction.operation == 'delete':
+            user_id = transaction.data.get('user_id')
             user_to_delete = User.query.get(user_id)
             
             if not user_to_delete:
                 return False, 'User not found'
             
-            transaction['prepared_data'] = {
-                'user': user_to_delete
+            transaction.prepared_data = {
+                'user_id': user_to_delete.id
             }
         
         else:
             return False, 'Unsupported operation'
         
-        transaction['status'] = 'PREPARED'
-        transaction['logs'].append(f'Prepared at {time.time()}')
+        with self.lock:
+            self.set_status(transaction, 'PREPARED', f'Prepared at {time.time()}')
         return True, 'Ready to commit'
     
     def commit_transaction(self, transaction_id):
-        transaction = self.transactions.get(transaction_id)
-        if not transaction or transaction['status'] != 'PREPARED':
+        transaction = self.get(transaction_id)
+        if not transaction or transaction.status != 'PREPARED':
             raise ValueError('Transaction not in prepared state')
         
         try:
-            if transaction['operation'] == 'register':
+            if transaction.operation == 'register':
                 # Commit new user registration
-                prepared_data = transaction['prepared_data']
+                prepared_data = transaction.prepared_data
                 new_account = User(
                     username=prepared_data['username'], 
                     email=prepared_data['email'], 
@@ -111,10 +385,12 @@ class TransactionManager:
                 )
                 db_instance.session.add(new_account)
             
-            elif transaction['operation'] == 'update':
+            elif transaction.operation == 'update':
                 # Commit user update
-                prepared_data = transaction['prepared_data']
-                user = prepared_data['user']
+                prepared_data = transaction.prepared_data
+                user = User.query.get(prepared_data['user_id'])
+                if not user:
+                    raise ValueError('User no longer exists')
                 
                 if prepared_data['new_username']:
                     user.username = prepared_data['new_username']
@@ -123,49 +399,73 @@ class TransactionManager:
                 if prepared_data['new_password_hash']:
                     user.password = prepared_data['new_password_hash']
             
-            elif transaction['operation'] == 'delete':
+            elif transaction.operation == 'delete':
                 # Commit user deletion
-                user_to_delete = transaction['prepared_data']['user']
+                user_to_delete = User.query.get(transaction.prepared_data['user_id'])
+                if not user_to_delete:
+                    raise ValueError('User no longer exists')
                 db_instance.session.delete(user_to_delete)
             
             db_instance.session.commit()
-            transaction['status'] = 'COMMITTED'
-            transaction['logs'].append(f'Committed at {time.time()}')
+            with self.lock:
+                self.set_status(transaction, 'COMMITTED', f'Committed at {time.time()}')
             return True, 'Transaction committed successfully'
         
         except Exception as e:
-            transaction['status'] = 'FAILED'
-            transaction['logs'].append(f'Commit failed: {str(e)}')
             db_instance.session.rollback()
+            with self.lock:
+                self.set_status(transaction, 'FAILED', f'Commit failed: {str(e)}')
             return False, str(e)
     
     def abort_transaction(self, transaction_id):
-        transaction = self.transactions.get(transaction_id)
+        transaction = self.get(transaction_id)
         if not transaction:
             raise ValueError('Transaction not found')
         
-        transaction['status'] = 'ABORTED'
-        transaction['logs'].append(f'Aborted at {time.time()}')
+        with self.lock:
+            self.set_status(transaction, 'ABORTED', f'Aborted at {time.time()}')
         return True, 'Transaction aborted'
     
     def get_transaction_status(self, transaction_id):
-        transaction = self.transactions.get(transaction_id)
+        transaction = self.get(transaction_id)
         if not transaction:
             raise ValueError('Transaction not found')
         
         return {
-            'id': transaction['id'],
-            'operation': transaction['operation'],
-            'status': transaction['status'],
-            'logs': transaction['logs'],
-            'created_at': transaction['created_at']
+            'id': transaction.id,
+            'operation': transaction.operation,
+            'status': transaction.status,
+            'logs': list(transaction.logs),
+            'created_at': transaction.created_at
         }
 
-# Initialize Transaction Manager
-transaction_manager = TransactionManager()
+transactions_gauge = Gauge('auth_transactions', 'Transactions held in memory', ['state'], multiprocess_mode='livesum',
+                           registry=metrics.registry)
+
+# Created per worker process by init_transaction_manager(), since it owns an open log file
+transaction_manager = None
+
+def init_transaction_manager():
+    global transaction_manager
+    transaction_manager = TransactionManager()
+    gauge_function(transactions_gauge.labels('active'), lambda: len(transaction_manager.active))
+    gauge_function(transactions_gauge.labels('finished'), lambda: len(transaction_manager.finished))
+
+# Status endpoints, probed several times a second: they serve the health checker's last result
+@auth_routes.route('/api/auth/status', methods=['GET'])
+@limiter.exempt
+@metrics.do_not_track()
+def service_status():
+    return health_checker.readiness()
+
+@auth_routes.route('/api/auth/status/live', methods=['GET'])
+@limiter.exempt
+@metrics.do_not_track()
+def service_liveness():
+    return health_checker.liveness()
 
 # Two-Phase Commit Transaction Endpoints
-@app_instance.route('/api/transactions/register', methods=['POST'])
+@auth_routes.route('/api/transactions/register', methods=['POST'])
 def initiate_registration_transaction():
     details = request.get_json()
     
@@ -189,7 +489,7 @@ def initiate_registration_transaction():
         'transaction_id': transaction_id
     }), 201
 
-@app_instance.route('/api/transactions/prepare', methods=['POST'])
+@auth_routes.route('/api/transactions/prepare', methods=['POST'])
 def prepare_transaction():
     transaction_id = request.json.get('transaction_id')
     
@@ -209,7 +509,7 @@ def prepare_transaction():
             'message': str(e)
         }), 404
 
-@app_instance.route('/api/transactions/commit', methods=['POST'])
+@auth_routes.route('/api/transactions/commit', methods=['POST'])
 def commit_transaction():
     transaction_id = request.json.get('transaction_id')
     
@@ -229,7 +529,7 @@ def commit_transaction():
             'message': str(e)
         }), 404
 
-@app_instance.route('/api/transactions/abort', methods=['POST'])
+@auth_routes.route('/api/transactions/abort', methods=['POST'])
 def abort_transaction():
     transaction_id = request.json.get('transaction_id')
     
@@ -249,7 +549,7 @@ def abort_transaction():
             'message': str(e)
         }), 404
 
-@app_instance.route('/api/transactions/<transaction_id>/status', methods=['GET'])
+@auth_routes.route('/api/transactions/<transaction_id>/status', methods=['GET'])
 def get_transaction_status(transaction_id):
     try:
         status = transaction_manager.get_transaction_status(transaction_id)
@@ -260,7 +560,8 @@ def get_transaction_status(transaction_id):
         }), 404
 
 # Existing Authentication Endpoints (slightly modified)
-@app_instance.route('/api/auth/register', methods=['POST'])
+@auth_routes.route('/api/auth/register', methods=['POST'])
+@limiter.limit('10/minute')
 def user_registration():
     details = request.get_json()
     username = details.get('username')
@@ -287,7 +588,66 @@ def user_registration():
 
     return jsonify({'message': 'User successfully registered', 'transaction_id': transaction_id}), 201
 
-@app_instance.route('/api/users/<int:user_id>', methods=['PUT'])
+@auth_routes.cli.command('import-users')
+@click.argument('path', type=click.File('rb'))
+def import_users_command(path):
+    """Bulk-register users from a JSONL file ("-" reads stdin)."""
+    created, rejected = import_users(path)
+
+    for row in rejected:
+        print(f"line {row['line']}: {row['message']}")
+    print(f"Registered {created} users, rejected {len(rejected)}")
+
+@auth_routes.route('/api/auth/login', methods=['POST'])
+@limiter.limit('20/minute')
+def user_login():
+    details = request.get_json()
+    email = details.get('email')
+    password = details.get('password')
+
+    if not all([email, password]):
+        return jsonify({'message': 'Missing required fields'}), 400
+
+    user = User.query.filter_by(email=email).first()
+    if not user or not verify_password(user.password, password):
+        return jsonify({'message': 'Invalid email or password'}), 401
+
+    # Transparently upgrade hashes made with an older algorithm or work factor
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+        db_instance.session.commit()
+
+    access_token = create_access_token(identity=user.id)
+
+    return jsonify({
+        'message': 'Login successful',
+        'access_token': access_token,
+        'user': user.username
+    }), 200
+
+@auth_routes.route('/api/auth/logout', methods=['POST'])
+@jwt_required()
+def user_logout():
+    # Revoke this token for the rest of its lifetime
+    token = get_jwt()
+    revoke_token(token['jti'], token['exp'])
+
+    return jsonify({'message': 'User logged out'}), 200
+
+@auth_routes.route('/api/users/<int:user_id>', methods=['GET'])
+@jwt_required()
+def get_user_info(user_id):
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    profile = {'id': user.id, 'username': user.username}
+    # The email is only shown to its owner
+    if str(get_jwt_identity()) == str(user.id):
+        profile['email'] = user.email
+    return jsonify(profile), 200
+
+@auth_routes.route('/api/users/<int:user_id>', methods=['PUT'])
 @jwt_required()
 def update_user_info(user_id):
     payload = request.get_json()
@@ -313,7 +673,7 @@ def update_user_info(user_id):
         'transaction_id': transaction_id
     }), 200
 
-@app_instance.route('/api/users/<int:user_id>', methods=['DELETE'])
+@auth_routes.route('/api/users/<int:user_id>', methods=['DELETE'])
 @jwt_required()
 def delete_user_account(user_id):
     # Create a transaction for deletion
@@ -335,3 +695,36 @@ def delete_user_account(user_id):
         'message': 'User account deleted successfully', 
         'transaction_id': transaction_id
     }), 200
+
+# Batch user lookup (public profiles only)
+@auth_routes.route('/api/users', methods=['GET'])
+def get_users_batch():
+    raw_ids = request.args.get('ids', '')
+
+    try:
+        user_ids = {int(user_id) for user_id in raw_ids.split(',') if user_id.strip()}
+    except ValueError:
+        return jsonify({'message': 'ids must be a comma-separated list of integers'}), 400
+
+    if len(user_ids) > USER_LOOKUP_MAX_IDS_QUERY:
+        return jsonify({'message': f'At most {USER_LOOKUP_MAX_IDS_QUERY} ids per GET, use POST /api/users/batch'}), 400
+
+    return lookup_public_profiles(user_ids)
+
+@auth_routes.route('/api/users/batch', methods=['POST'])
+def post_users_batch():
+    details = request.get_json()
+    raw_ids = details.get('ids') if isinstance(details, dict) else None
+
+    if not isinstance(raw_ids, list):
+        return jsonify({'message': 'Missing required field: ids'}), 400
+
+    try:
+        user_ids = {int(user_id) for user_id in raw_ids}
+    except (TypeError, ValueError):
+        return jsonify({'message': 'ids must be a list of integers'}), 400
+
+    if len(user_ids) > USER_LOOKUP_MAX_IDS_BODY:
+        return jsonify({'message': f'At most {USER_LOOKUP_MAX_IDS_BODY} ids per request'}), 400
+
+    return lookup_public_profiles(user_ids)
@@ -0,0 +1,134 @@
+from flask_jwt_extended import JWTManager
+import hashlib
+import math
+import os
+import redis
+import threading
+import time
+
+# Revoked tokens live in Redis as jwt:revoked:<jti> until the token would have expired anyway.
+# Every replica keeps a Bloom filter of revoked jtis, fed over pub/sub, so the common
+# "not revoked" answer needs no network round-trip.
+REVOKED_KEY_PREFIX = 'jwt:revoked:'
+REVOKED_CHANNEL = 'jwt:revoked'
+BLOOM_CAPACITY = int(os.environ.get('JWT_DENYLIST_CAPACITY', 100000))
+BLOOM_ERROR_RATE = float(os.environ.get('JWT_DENYLIST_ERROR_RATE', 0.01))
+# Bloom filters can't forget, so they are rebuilt from the live Redis keys on this interval
+BLOOM_REBUILD_INTERVAL = int(os.environ.get('JWT_DENYLIST_REBUILD_INTERVAL', 300))
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions derived from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class TokenDenylist:
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.lock = threading.Lock()
+        self.bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        # jtis seen while a rebuild is running, so the new filter doesn't miss them
+        self.received_during_rebuild = None
+
+    def revoke(self, jti, expires_at):
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return
+        self.redis.set(f'{REVOKED_KEY_PREFIX}{jti}', 1, ex=ttl)
+        self.add(jti)
+        self.redis.publish(REVOKED_CHANNEL, jti)
+
+    def is_revoked(self, jti):
+        if jti not in self.bloom:
+            return False
+        try:
+            return bool(self.redis.exists(f'{REVOKED_KEY_PREFIX}{jti}'))
+        except redis.RedisError:
+            # Can't confirm a possible revocation; refuse the token rather than accept it
+            return True
+
+    def add(self, jti):
+        with self.lock:
+            self.bloom.add(jti)
+            if self.received_during_rebuild is not None:
+                self.received_during_rebuild.add(jti)
+
+    def rebuild(self):
+        with self.lock:
+            self.received_during_rebuild = set()
+
+        bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        try:
+            for key in self.redis.scan_iter(f'{REVOKED_KEY_PREFIX}*', count=1000):
+                key = key.decode() if isinstance(key, bytes) else key
+                bloom.add(key[len(REVOKED_KEY_PREFIX):])
+        except Exception:
+            with self.lock:
+                self.received_during_rebuild = None
+            raise
+
+        with self.lock:
+            for jti in self.received_during_rebuild:
+                bloom.add(jti)
+            self.received_during_rebuild = None
+            self.bloom = bloom
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REVOKED_CHANNEL)
+                # Catch up on anything revoked while we were not subscribed
+                self.rebuild()
+                next_rebuild = time.monotonic() + BLOOM_REBUILD_INTERVAL
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        data = message['data']
+                        self.add(data.decode() if isinstance(data, bytes) else data)
+                    if time.monotonic() >= next_rebuild:
+                        self.rebuild()
+                        next_rebuild = time.monotonic() + BLOOM_REBUILD_INTERVAL
+            except Exception as e:
+                print(f"Token denylist listener error: {str(e)}")
+                time.sleep(1)
+
+    def start(self):
+        threading.Thread(target=self.listen, name='token-denylist', daemon=True).start()
+
+denylist = None
+
+def init_denylist(app, redis_client):
+    """Attach the Redis/Bloom revocation check to the app's JWTManager.
+
+    The pub/sub listener is started separately by start_denylist_listener(), once per worker process.
+    """
+    global denylist
+    jwt_manager = app.extensions.get('flask-jwt-extended') or JWTManager(app)
+    denylist = TokenDenylist(redis_client)
+
+    @jwt_manager.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return denylist.is_revoked(jwt_payload['jti'])
+
+    return denylist
+
+def start_denylist_listener():
+    denylist.start()
+
+def revoke_token(jti, expires_at):
+    denylist.revoke(jti, expires_at)
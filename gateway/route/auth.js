@@ -5,13 +5,18 @@ const axios = require('axios');
 const API_URL = 'http://login-service:5000/api';
 
 const getAuthHeader = (req) => req.headers.authorization ? { Authorization: req.headers.authorization } : {};
+// Services rate limit anonymous callers by the client address, not the gateway's
+const getForwardHeaders = (req) => ({ ...getAuthHeader(req), 'X-Forwarded-For': req.ip });
 
 const handleRequest = async (req, res, method, endpoint, data = {}) => {
     try {
-        const config = { method, url: `${API_URL}${endpoint}`, data, headers: getAuthHeader(req) };
+        const config = { method, url: `${API_URL}${endpoint}`, params: req.query, data, headers: getForwardHeaders(req) };
         const response = await axios(config);
         res.json(response.data);
     } catch (error) {
+        // Rate limited callers need to know when to come back
+        const retryAfter = error.response?.headers['retry-after'];
+        if (retryAfter) res.set('Retry-After', retryAfter);
         res.status(error.response?.status || 500).json(error.response?.data || { message: 'Request failed' });
     }
 };
@@ -22,6 +27,7 @@ router.post('/auth/register', (req, res) => handleRequest(req, res, 'post', '/au
 router.post('/auth/logout', (req, res) => handleRequest(req, res, 'post', '/auth/logout'));
 router.get('/auth/protected', (req, res) => handleRequest(req, res, 'get', '/auth/protected'));
 router.get('/auth/status', (req, res) => handleRequest(req, res, 'get', '/auth/status'));
+router.get('/auth/status/live', (req, res) => handleRequest(req, res, 'get', '/auth/status/live'));
 router.get('/auth/timeout', (req, res) => handleRequest(req, res, 'get', '/auth/timeout'));
 
 // User Routes
@@ -4,22 +4,30 @@ const axios = require('axios');
 
 const MOVIE_SERVICE_URL = 'http://movie-management-service:5001/api';
 const getAuthHeader = (req) => req.headers.authorization ? { Authorization: req.headers.authorization } : {};
+// Services rate limit anonymous callers by the client address, not the gateway's
+const getForwardHeaders = (req) => ({ ...getAuthHeader(req), 'X-Forwarded-For': req.ip });
 
+// The client's query string is passed through unchanged (paging, sorting and filter parameters)
 const handleRequest = async (req, res, method, endpoint, data = {}) => {
     try {
-        const config = { method, url: `${MOVIE_SERVICE_URL}${endpoint}`, data, headers: getAuthHeader(req) };
+        const config = { method, url: `${MOVIE_SERVICE_URL}${endpoint}`, params: req.query, data, headers: getForwardHeaders(req) };
         const response = await axios(config);
         res.status(method === 'post' ? 201 : 200).json(response.data);
     } catch (error) {
+        // Rate limited callers need to know when to come back
+        const retryAfter = error.response?.headers['retry-after'];
+        if (retryAfter) res.set('Retry-After', retryAfter);
         res.status(error.response?.status || 500).send(error.response?.data || 'Server error');
     }
 };
 
 // Movie Routes
+router.get('/status', (req, res) => handleRequest(req, res, 'get', '/movies/status'));
+router.get('/status/live', (req, res) => handleRequest(req, res, 'get', '/movies/status/live'));
+router.get('/popular', (req, res) => handleRequest(req, res, 'get', '/movies/popular'));
+router.get('/search', (req, res) => handleRequest(req, res, 'get', '/movies/search'));
 router.get('/:id', (req, res) => handleRequest(req, res, 'get', `/movies/${req.params.id}`));
 router.get('/', (req, res) => handleRequest(req, res, 'get', '/movies'));
-router.get('/popular', (req, res) => handleRequest(req, res, 'get', '/movies/popular'));
-router.get('/search', (req, res) => handleRequest(req, res, 'get', '/movies/search', req.query));
 router.post('/', (req, res) => handleRequest(req, res, 'post', '/movies', req.body));
 router.put('/:id', (req, res) => handleRequest(req, res, 'put', `/movies/${req.params.id}`, req.body));
 router.delete('/:id', (req, res) => handleRequest(req, res, 'delete', `/movies/${req.params.id}`));
@@ -30,7 +38,9 @@ router.route('/reviews/:id')
     .put((req, res) => handleRequest(req, res, 'put', `/reviews/${req.params.id}`, req.body))
     .delete((req, res) => handleRequest(req, res, 'delete', `/reviews/${req.params.id}`));
 router.get('/:movieId/reviews', (req, res) => handleRequest(req, res, 'get', `/movies/${req.params.movieId}/reviews`));
+router.get('/:movieId/reviews/summary', (req, res) => handleRequest(req, res, 'get', `/movies/${req.params.movieId}/reviews/summary`));
 router.post('/reviews', (req, res) => handleRequest(req, res, 'post', '/reviews', req.body));
+router.post('/reviews/batch', (req, res) => handleRequest(req, res, 'post', '/reviews/batch', req.body));
 
 // Profile Routes
 router.route('/profile')
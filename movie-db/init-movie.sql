@@ -6,6 +6,11 @@ CREATE TABLE movies (
     description TEXT,
     release_date DATE,
     rating FLOAT CHECK (rating >= 0 AND rating <= 10),
+    genre VARCHAR(100),
+    director VARCHAR(255),
+    rating_sum FLOAT NOT NULL DEFAULT 0,
+    review_count INT NOT NULL DEFAULT 0,
+    average_rating FLOAT NOT NULL DEFAULT 0,
     image_url VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -13,9 +18,13 @@ CREATE TABLE movies (
 -- Create a table for reviews
 CREATE TABLE reviews (
     id SERIAL PRIMARY KEY,
-    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    user_id INT NOT NULL,
     movie_id INT NOT NULL REFERENCES movies(id) ON DELETE CASCADE,
     review_text TEXT NOT NULL,
-    rating INT CHECK (rating >= 1 AND rating <= 10),
+    rating FLOAT CHECK (rating >= 0 AND rating <= 5),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Keyset pagination and per-movie aggregates over reviews
+CREATE INDEX idx_reviews_movie_id ON reviews (movie_id, id);
+CREATE INDEX idx_reviews_movie_created_at ON reviews (movie_id, created_at, id);
@@ -0,0 +1,78 @@
+from cache import cache_get, cache_set
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import os
+import requests
+
+LOGIN_SERVICE_URL = 'http://login-service:5000/api'
+
+# (connect, read) timeouts in seconds for every call to the auth service
+AUTH_TIMEOUT = (float(os.environ.get('AUTH_CONNECT_TIMEOUT', 1)), float(os.environ.get('AUTH_READ_TIMEOUT', 3)))
+AUTH_POOL_SIZE = int(os.environ.get('AUTH_POOL_SIZE', 20))
+AUTH_RETRIES = int(os.environ.get('AUTH_RETRIES', 3))
+AUTH_RETRY_BACKOFF = float(os.environ.get('AUTH_RETRY_BACKOFF', 0.1))
+
+# Positive "user exists" answers are cached briefly so most review writes skip the call
+USER_EXISTS_KEY = 'auth:user_exists:{}'
+USER_EXISTS_TTL = int(os.environ.get('USER_EXISTS_TTL', 60))
+
+PROFILE_LOOKUP_GET_MAX_IDS = 200
+
+def build_session():
+    # Only idempotent reads are retried on 5xx; connection failures are retried for any method
+    retry = Retry(
+        total=AUTH_RETRIES,
+        backoff_factor=AUTH_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AUTH_POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Shared keep-alive connection pool to the auth service
+auth_session = build_session()
+
+def auth_headers(authorization):
+    return {'Authorization': f'{authorization}'}
+
+def get_user(user_id, authorization):
+    return auth_session.get(f'{LOGIN_SERVICE_URL}/users/{user_id}',
+                            headers=auth_headers(authorization), timeout=AUTH_TIMEOUT)
+
+def update_user(user_id, data, authorization):
+    return auth_session.put(f'{LOGIN_SERVICE_URL}/users/{user_id}', json=data,
+                            headers=auth_headers(authorization), timeout=AUTH_TIMEOUT)
+
+def get_public_profiles(user_ids):
+    """Return {user_id: {'id', 'username'}} for user_ids with one call to the auth service."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return {}
+
+    # Short id lists fit the query string; bigger sets go in a POST body
+    if len(user_ids) <= PROFILE_LOOKUP_GET_MAX_IDS:
+        response = auth_session.get(f'{LOGIN_SERVICE_URL}/users',
+                                    params={'ids': ','.join(map(str, user_ids))}, timeout=AUTH_TIMEOUT)
+    else:
+        response = auth_session.post(f'{LOGIN_SERVICE_URL}/users/batch',
+                                     json={'ids': user_ids}, timeout=AUTH_TIMEOUT)
+    response.raise_for_status()
+
+    return {user['id']: user for user in response.json()['users']}
+
+def user_exists(user_id, authorization):
+    """Return True if the auth service knows user_id. Raises requests.RequestException if it can't be reached."""
+    key = USER_EXISTS_KEY.format(user_id)
+    if cache_get(key):
+        return True
+
+    if get_user(user_id, authorization).status_code != 200:
+        return False
+
+    cache_set(key, True, USER_EXISTS_TTL)
+    return True
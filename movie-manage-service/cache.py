@@ -0,0 +1,288 @@
+from extensions import redis_client, metrics
+from process_metrics import gauge_function
+from prometheus_client import Counter, Gauge
+from collections import OrderedDict
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+# Extra seconds an entry stays in Redis after it goes stale, so it can be served while one worker refreshes it
+STALE_GRACE = 60
+# +/- fraction applied to every TTL so keys written together don't expire together
+TTL_JITTER = 0.1
+# How long a refresh lock is held at most, and how long a caller with nothing to serve waits for it
+LOCK_TTL = 10
+LOCK_WAIT_TIMEOUT = 2.0
+LOCK_WAIT_INTERVAL = 0.05
+
+# In-process tier in front of Redis. Entries are dropped on pub/sub invalidation from any
+# replica; the short TTL bounds staleness if a message is missed.
+LOCAL_CACHE_MAX_ENTRIES = int(os.environ.get('LOCAL_CACHE_MAX_ENTRIES', 10000))
+LOCAL_CACHE_MAX_BYTES = int(os.environ.get('LOCAL_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+LOCAL_CACHE_TTL = float(os.environ.get('LOCAL_CACHE_TTL', 5))
+INVALIDATION_CHANNEL = 'cache:invalidate'
+FLUSH_ALL = '*'
+
+# Every invalidation bumps a version next to the key. A backfill from the database reads the
+# version before querying and only writes if it is unchanged, so a reader that queried before a
+# write committed can't put the old value back after the writer's invalidation. Versions only
+# need to outlive a backfill in flight.
+VERSION_KEY = '{}:version'
+VERSION_TTL = 300
+
+# KEYS[1] key, KEYS[2] its version; ARGV[1] value, ARGV[2] version read before the query ('' for none), ARGV[3] TTL
+SET_IF_VERSION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+# Deletes the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+cache_requests = Counter(
+    'movie_cache_requests',
+    'Cached reads by cache name and outcome (hit, miss, stale, coalesced)',
+    ['cache', 'result'],
+    registry=metrics.registry
+)
+cache_tier_requests = Counter(
+    'movie_cache_tier_requests',
+    'Cache lookups by tier (local, redis) and result (hit, miss)',
+    ['tier', 'result'],
+    registry=metrics.registry
+)
+
+class LocalCache:
+    """Thread-safe LRU of decoded values, bounded by entry count and approximate payload bytes."""
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            expires_at, _, value = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size, ttl=None):
+        if size > self.max_bytes:
+            return
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (time.monotonic() + ttl, size, value)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        item = self.entries.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+local_cache = LocalCache(LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_MAX_BYTES, LOCAL_CACHE_TTL)
+
+gauge_function(Gauge('movie_local_cache_entries', 'Entries held in the in-process cache',
+                     multiprocess_mode='livesum', registry=metrics.registry),
+               lambda: len(local_cache.entries))
+gauge_function(Gauge('movie_local_cache_bytes', 'Approximate payload bytes held in the in-process cache',
+                     multiprocess_mode='livesum', registry=metrics.registry),
+               lambda: local_cache.size)
+
+def decode_text(raw):
+    return raw.decode() if isinstance(raw, bytes) else raw
+
+def cache_get_many(keys, decode=json.loads):
+    """Look keys up in the local tier, then fetch the rest with one MGET. Missing keys map to None."""
+    values = {}
+    remote_keys = []
+    for key in keys:
+        value = local_cache.get(key)
+        if value is None:
+            cache_tier_requests.labels('local', 'miss').inc()
+            remote_keys.append(key)
+        else:
+            cache_tier_requests.labels('local', 'hit').inc()
+            values[key] = value
+
+    if remote_keys:
+        for key, raw in zip(remote_keys, redis_client.mget(remote_keys)):
+            if raw is None:
+                cache_tier_requests.labels('redis', 'miss').inc()
+                values[key] = None
+                continue
+            cache_tier_requests.labels('redis', 'hit').inc()
+            value = decode(raw)
+            local_cache.set(key, value, len(raw))
+            values[key] = value
+
+    return values
+
+def cache_get(key, decode=json.loads):
+    return cache_get_many([key], decode)[key]
+
+def cache_set(key, value, ttl, encode=json.dumps, pipeline=None):
+    raw = encode(value)
+    (pipeline or redis_client).set(key, raw, ex=ttl)
+    local_cache.set(key, value, len(raw), ttl)
+
+set_if_version = redis_client.register_script(SET_IF_VERSION_SCRIPT)
+
+def cache_versions(keys):
+    """Versions of keys to pass to cache_set_if_unchanged(); read them before querying the database."""
+    return [decode_text(version) or '' for version in redis_client.mget([VERSION_KEY.format(key) for key in keys])]
+
+def cache_set_if_unchanged(entries, ttl, encode=json.dumps):
+    """Write (key, value, version) entries whose key has not been invalidated since its version was read."""
+    if not entries:
+        return
+    pipeline = redis_client.pipeline(transaction=False)
+    raws = []
+    for key, value, version in entries:
+        raw = encode(value)
+        raws.append(raw)
+        set_if_version(keys=[key, VERSION_KEY.format(key)], args=[raw, version, ttl], client=pipeline)
+    for (key, value, _), raw, written in zip(entries, raws, pipeline.execute()):
+        if written:
+            local_cache.set(key, value, len(raw), ttl)
+
+def delete_versioned(pipeline, keys):
+    """Queue deleting keys from Redis on pipeline, bumping their versions."""
+    pipeline.delete(*keys)
+    for key in keys:
+        pipeline.incr(VERSION_KEY.format(key))
+        pipeline.expire(VERSION_KEY.format(key), VERSION_TTL)
+
+def invalidate(*keys, remote=True):
+    """Drop keys from Redis (unless remote=False) and from the local tier of every replica."""
+    if remote:
+        pipeline = redis_client.pipeline(transaction=False)
+        delete_versioned(pipeline, keys)
+        pipeline.execute()
+    local_cache.delete(*keys)
+    redis_client.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+
+def flush_local_caches():
+    local_cache.clear()
+    redis_client.publish(INVALIDATION_CHANNEL, json.dumps([FLUSH_ALL]))
+
+def listen_for_invalidations():
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Anything may have changed while we were not subscribed
+            local_cache.clear()
+            for message in pubsub.listen():
+                keys = json.loads(message['data'])
+                if FLUSH_ALL in keys:
+                    local_cache.clear()
+                else:
+                    local_cache.delete(*keys)
+        except Exception as e:
+            print(f"Cache invalidation listener error: {str(e)}")
+            time.sleep(1)
+
+_listener_started = False
+
+def start_invalidation_listener():
+    global _listener_started
+    if not _listener_started:
+        _listener_started = True
+        threading.Thread(target=listen_for_invalidations, name='cache-invalidation', daemon=True).start()
+
+def jittered_ttl(ttl):
+    return max(1, int(ttl * random.uniform(1 - TTL_JITTER, 1 + TTL_JITTER)))
+
+def write_entry(key, value, ttl, version):
+    """Store value for key unless key was invalidated after version was read."""
+    ttl = jittered_ttl(ttl)
+    entry = {'fresh_until': time.time() + ttl, 'value': value}
+    cache_set_if_unchanged([(key, entry, version)], ttl + STALE_GRACE)
+
+def is_fresh(entry):
+    return entry is not None and entry['fresh_until'] > time.time()
+
+def get_or_compute(key, compute, ttl, name):
+    """Return (value, from_cache) for key, recomputing it with compute() at most once across replicas.
+
+    A fresh entry is returned as is. When the entry is stale or missing, the caller
+    that wins the Redis lock recomputes it while everyone else gets the stale value,
+    or, if there is none yet, waits briefly for the winner's result. The result is only
+    written back if key was not invalidated while compute() ran.
+    """
+    entry = local_cache.get(key)
+    if is_fresh(entry):
+        cache_tier_requests.labels('local', 'hit').inc()
+    else:
+        # A stale local copy may already have been refreshed in Redis by another replica
+        local_cache.delete(key)
+        entry = cache_get(key)
+
+    if is_fresh(entry):
+        cache_requests.labels(name, 'hit').inc()
+        return entry['value'], True
+
+    lock_key = f'lock:{key}'
+    token = str(uuid.uuid4())
+    if redis_client.set(lock_key, token, nx=True, ex=LOCK_TTL):
+        try:
+            [version] = cache_versions([key])
+            value = compute()
+            write_entry(key, value, ttl, version)
+        finally:
+            redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        cache_requests.labels(name, 'miss').inc()
+        return value, False
+
+    if entry:
+        cache_requests.labels(name, 'stale').inc()
+        return entry['value'], True
+
+    deadline = time.time() + LOCK_WAIT_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(LOCK_WAIT_INTERVAL)
+        entry = cache_get(key)
+        if entry:
+            cache_requests.labels(name, 'coalesced').inc()
+            return entry['value'], True
+
+    # The lock holder is too slow or died; don't keep the client waiting any longer
+    [version] = cache_versions([key])
+    value = compute()
+    write_entry(key, value, ttl, version)
+    cache_requests.labels(name, 'miss').inc()
+    return value, False
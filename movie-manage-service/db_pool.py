@@ -0,0 +1,104 @@
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from process_metrics import gauge_function
+import os
+import time
+
+# Per-process pool settings. Postgres sees up to replicas * workers * (size + overflow)
+# connections, so size these against the replica count and max_connections.
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+POOL_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+# Seconds to wait for Postgres to accept a new connection before counting it as a connect error
+CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+
+class PoolMetrics:
+    """Pool metrics for one prefix and registry, reading whichever engine was instrumented last."""
+
+    def __init__(self, prefix, registry):
+        self.engine = None
+        self.checkout_wait = Histogram(
+            f'{prefix}_db_pool_checkout_wait_seconds',
+            'Time spent waiting for a pooled database connection',
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+            registry=registry
+        )
+        self.errors = Counter(
+            f'{prefix}_db_pool_errors',
+            'Database connection failures',
+            ['reason'],
+            registry=registry
+        )
+
+        # Read on scrape; engine.pool is looked up each time since dispose() replaces it
+        gauges = [
+            ('size', 'Configured number of pooled connections', lambda: self.engine.pool.size()),
+            ('checked_out', 'Pooled connections currently in use', lambda: self.engine.pool.checkedout()),
+            ('idle', 'Pooled connections open and waiting to be used', lambda: self.engine.pool.checkedin()),
+            ('overflow', 'Connections open beyond the pool size', lambda: max(0, self.engine.pool.overflow()))
+        ]
+        for name, documentation, function in gauges:
+            gauge_function(Gauge(f'{prefix}_db_pool_{name}', documentation,
+                                 multiprocess_mode='livesum', registry=registry), function)
+
+# Metrics can only be registered once per registry, but an app factory may run more than once
+_pool_metrics = {}
+
+def pool_metrics(prefix, registry):
+    key = (prefix, registry)
+    if key not in _pool_metrics:
+        _pool_metrics[key] = PoolMetrics(prefix, registry)
+    return _pool_metrics[key]
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited and why it failed."""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics:
+                self.metrics.errors.labels('timeout').inc()
+            raise
+        except Exception:
+            if self.metrics:
+                self.metrics.errors.labels('connect').inc()
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.checkout_wait.observe(time.perf_counter() - start)
+
+def engine_options():
+    """Value for SQLALCHEMY_ENGINE_OPTIONS."""
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': POOL_SIZE,
+        'max_overflow': POOL_MAX_OVERFLOW,
+        'pool_timeout': POOL_TIMEOUT,
+        'pool_recycle': POOL_RECYCLE,
+        'pool_pre_ping': POOL_PRE_PING,
+        'connect_args': {'connect_timeout': CONNECT_TIMEOUT}
+    }
+
+def instrument_pool(engine, prefix, registry):
+    """Export the engine's pool usage through registry, with metric names starting with prefix."""
+    metrics = pool_metrics(prefix, registry)
+    metrics.engine = engine
+    TimedQueuePool.metrics = metrics
+
+    @event.listens_for(engine, 'handle_error')
+    def count_disconnects(context):
+        if context.is_disconnect:
+            metrics.errors.labels('disconnect').inc()
+
+    @event.listens_for(engine.pool, 'invalidate')
+    def count_invalidations(dbapi_connection, connection_record, exception):
+        # Pre-ping and disconnect handling throw away dead connections
+        metrics.errors.labels('invalidated').inc()
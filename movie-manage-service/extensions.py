@@ -0,0 +1,28 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_jwt_extended import JWTManager
+from flask_socketio import SocketIO
+from prometheus_flask_exporter import PrometheusMetrics
+from rate_limit import RateLimiter
+from health import HealthChecker
+from notifications import NotificationBatcher
+from outbound import OutboundQueues
+from lobby_history import LobbyHistory, RedisLobbyHistory, LOBBY_HISTORY_BACKEND
+import os
+import redis
+
+# Limit for routes without their own, shared by every replica (empty disables it)
+DEFAULT_RATE_LIMIT = os.environ.get('RATE_LIMIT_DEFAULT', '600/minute')
+
+# Extensions are created unbound so routes, models and socket handlers can import them
+# before the app exists; create_app() attaches them.
+db = SQLAlchemy()
+jwt = JWTManager()
+socketio = SocketIO()
+metrics = PrometheusMetrics.for_app_factory()
+notifications = NotificationBatcher(socketio)
+outbound_queues = OutboundQueues()
+
+redis_client = redis.Redis(host='redis', port=6379, db=0)
+limiter = RateLimiter(redis_client=redis_client, default_limits=[DEFAULT_RATE_LIMIT])
+health_checker = HealthChecker(redis_client)
+lobby_history = RedisLobbyHistory(redis_client) if LOBBY_HISTORY_BACKEND == 'redis' else LobbyHistory()
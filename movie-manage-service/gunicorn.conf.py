@@ -0,0 +1,56 @@
+import os
+import resource
+import shutil
+
+# Green-thread workers matching SOCKETIO_ASYNC_MODE: every websocket stays open for the whole
+# session and costs a green thread (a few KB) instead of an OS thread.
+# Socket.IO needs sticky sessions, so keep one worker per container and scale with replicas.
+WORKER_CLASSES = {
+    'eventlet': 'eventlet',
+    'gevent': 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker',
+    'threading': 'gthread'
+}
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS',
+                              WORKER_CLASSES[os.environ.get('SOCKETIO_ASYNC_MODE', 'eventlet')])
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 10000))
+
+# eventlet/gevent must patch the standard library before the app is imported, which
+# preloading in the master would defeat; only enable it for non-green workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+# Graceful restarts: SIGHUP reloads workers, open requests get graceful_timeout to finish
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+
+# Every worker writes its Prometheus metrics here and /metrics merges them.
+# Must be set before prometheus_client is imported by the app.
+multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-multiproc')
+
+# This file is read again on every SIGHUP; only the first read drops samples left by a previous run
+if os.environ.get('PROMETHEUS_MULTIPROC_OWNER') != str(os.getpid()):
+    os.environ['PROMETHEUS_MULTIPROC_OWNER'] = str(os.getpid())
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+def on_starting(server):
+    # Each connection is a file descriptor; the default soft limit (often 1024) caps a worker
+    # far below worker_connections
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = worker_connections + 1024
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE,
+                           (wanted if hard == resource.RLIM_INFINITY else min(wanted, hard), hard))
+
+def post_worker_init(worker):
+    from app import init_worker
+    init_worker(worker.wsgi)
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,92 @@
+from flask import Response
+from sqlalchemy import text
+from db_pool import POOL_MAX_OVERFLOW
+import json
+import os
+import threading
+import time
+
+# Dependencies are checked in the background; probes only read the last result
+HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL', 2))
+# A result older than this means the checker itself is stuck (e.g. on a hung connection)
+HEALTH_STALE_AFTER = float(os.environ.get('HEALTH_STALE_AFTER', HEALTH_CHECK_INTERVAL * 5))
+
+LIVE_BODY = json.dumps({'status': 'OK'})
+
+def json_response(body, status):
+    return Response(body, status=status, mimetype='application/json')
+
+class HealthChecker:
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.engine = None
+        self.checked_at = None
+        self.body = json.dumps({'status': 'ERROR', 'database': 'Not connected', 'error': 'Starting up'})
+        self.status_code = 500
+
+    def pool_status(self):
+        pool = self.engine.pool
+        capacity = pool.size() + POOL_MAX_OVERFLOW
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(0, pool.overflow()),
+            'saturation': round(pool.checkedout() / capacity, 3) if capacity else 0
+        }
+
+    def check(self):
+        errors = []
+        database = 'Connected'
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            database = 'Not connected'
+            errors.append(f'database: {str(e)}')
+
+        redis_status = 'Connected'
+        try:
+            self.redis.ping()
+        except Exception as e:
+            redis_status = 'Not connected'
+            errors.append(f'redis: {str(e)}')
+
+        status = {
+            'status': 'ERROR' if errors else 'OK',
+            'database': database,
+            'redis': redis_status,
+            'pool': self.pool_status(),
+            'checked_at': time.time()
+        }
+        if errors:
+            status['error'] = '; '.join(errors)
+
+        # Encoded once here so each probe only copies a string
+        self.body = json.dumps(status)
+        self.status_code = 500 if errors else 200
+        self.checked_at = time.monotonic()
+
+    def run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Health check error: {str(e)}")
+            time.sleep(HEALTH_CHECK_INTERVAL)
+
+    def start(self, engine):
+        self.engine = engine
+        threading.Thread(target=self.run, name='health-check', daemon=True).start()
+
+    def readiness(self):
+        if self.checked_at is not None and time.monotonic() - self.checked_at > HEALTH_STALE_AFTER:
+            return json_response(json.dumps({
+                'status': 'ERROR',
+                'database': 'Unknown',
+                'error': f'No health check for {int(time.monotonic() - self.checked_at)}s'
+            }), 500)
+        return json_response(self.body, self.status_code)
+
+    def liveness(self):
+        # Only says the worker is serving requests; dependencies are readiness' concern
+        return json_response(LIVE_BODY, 200)
@@ -0,0 +1,102 @@
+from extensions import db, redis_client
+from models.movies import Movie
+from sqlalchemy import func
+
+# Sorted sets of movie id -> average rating, one global and one per genre
+LEADERBOARD_KEY = 'leaderboard:movies'
+GENRE_LEADERBOARD_PREFIX = 'leaderboard:movies:genre:'
+REBUILD_LOCK_KEY = 'lock:leaderboard:rebuild'
+REBUILD_LOCK_TTL = 120
+REBUILD_BATCH_SIZE = 1000
+
+def normalize_genre(genre):
+    return genre.strip().lower() if genre else None
+
+def leaderboard_key(genre=None):
+    genre = normalize_genre(genre)
+    return f'{GENRE_LEADERBOARD_PREFIX}{genre}' if genre else LEADERBOARD_KEY
+
+def update_movie_score(movie_id, genre, score, old_genre=None):
+    pipeline = redis_client.pipeline(transaction=False)
+    if old_genre is not None and normalize_genre(old_genre) != normalize_genre(genre):
+        pipeline.zrem(leaderboard_key(old_genre), movie_id)
+    pipeline.zadd(LEADERBOARD_KEY, {movie_id: score or 0})
+    if normalize_genre(genre):
+        pipeline.zadd(leaderboard_key(genre), {movie_id: score or 0})
+    pipeline.execute()
+
+def update_movie_scores(scores):
+    """Apply many (movie_id, genre, score) updates in one round-trip."""
+    pipeline = redis_client.pipeline(transaction=False)
+    for movie_id, genre, score in scores:
+        pipeline.zadd(LEADERBOARD_KEY, {movie_id: score or 0})
+        if normalize_genre(genre):
+            pipeline.zadd(leaderboard_key(genre), {movie_id: score or 0})
+    pipeline.execute()
+
+def remove_movie(movie_id, genre):
+    pipeline = redis_client.pipeline(transaction=False)
+    pipeline.zrem(LEADERBOARD_KEY, movie_id)
+    if normalize_genre(genre):
+        pipeline.zrem(leaderboard_key(genre), movie_id)
+    pipeline.execute()
+
+def rebuild_leaderboard():
+    """Reseed every leaderboard from the database. Returns the number of movies ranked.
+
+    Scores are written to temporary keys and swapped in with RENAME, so readers
+    never see a half-built leaderboard.
+    """
+    staging_keys = {}
+    count = 0
+    pipeline = redis_client.pipeline(transaction=False)
+
+    rows = db.session.query(Movie.id, Movie.genre, Movie.average_rating) \
+        .yield_per(REBUILD_BATCH_SIZE)
+    for movie_id, genre, average_rating in rows:
+        keys = [LEADERBOARD_KEY]
+        if normalize_genre(genre):
+            keys.append(leaderboard_key(genre))
+        for key in keys:
+            if key not in staging_keys:
+                # Clear leftovers from an interrupted rebuild before filling it
+                staging_keys[key] = f'{key}:rebuild'
+                pipeline.delete(staging_keys[key])
+            pipeline.zadd(staging_keys[key], {movie_id: average_rating or 0})
+        count += 1
+        if count % REBUILD_BATCH_SIZE == 0:
+            pipeline.execute()
+    pipeline.execute()
+
+    # Genres that no longer have any movie must disappear too
+    for key in redis_client.scan_iter(f'{GENRE_LEADERBOARD_PREFIX}*'):
+        key = key.decode() if isinstance(key, bytes) else key
+        if key not in staging_keys and not key.endswith(':rebuild'):
+            pipeline.delete(key)
+    if not staging_keys:
+        pipeline.delete(LEADERBOARD_KEY)
+    for key, staging_key in staging_keys.items():
+        pipeline.rename(staging_key, key)
+    pipeline.execute()
+
+    return count
+
+def top_movie_ids(limit, offset=0, genre=None):
+    key = leaderboard_key(genre)
+    movie_ids = redis_client.zrevrange(key, offset, offset + limit - 1)
+    if movie_ids or redis_client.exists(LEADERBOARD_KEY):
+        return [int(movie_id) for movie_id in movie_ids]
+
+    # The leaderboard was never seeded or Redis was flushed: one worker rebuilds it
+    if redis_client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_TTL):
+        try:
+            rebuild_leaderboard()
+        finally:
+            redis_client.delete(REBUILD_LOCK_KEY)
+        return [int(movie_id) for movie_id in redis_client.zrevrange(key, offset, offset + limit - 1)]
+
+    # Another worker is rebuilding; answer from the database meanwhile
+    query = db.session.query(Movie.id)
+    if normalize_genre(genre):
+        query = query.filter(func.lower(func.trim(Movie.genre)) == normalize_genre(genre))
+    return [row.id for row in query.order_by(Movie.average_rating.desc()).offset(offset).limit(limit)]
@@ -0,0 +1,116 @@
+from collections import OrderedDict, deque
+import json
+import os
+import redis
+import threading
+
+# Recent chat messages kept per lobby so late joiners can catch up with join_lobby's since_seq.
+# memory keeps them in this process (one replica); redis keeps them in a stream per lobby that
+# every replica shares. Replicas fanning events out through Redis must share the sequence
+# numbers too, so redis is the default whenever SOCKETIO_MESSAGE_QUEUE is.
+LOBBY_HISTORY_BACKEND = os.environ.get(
+    'LOBBY_HISTORY_BACKEND', 'redis' if os.environ.get('SOCKETIO_MESSAGE_QUEUE', 'redis') == 'redis' else 'memory')
+LOBBY_HISTORY_SIZE = int(os.environ.get('LOBBY_HISTORY_SIZE', 100))
+# memory: total size of the stored messages across lobbies; least recently used lobbies go first
+LOBBY_HISTORY_MAX_BYTES = int(os.environ.get('LOBBY_HISTORY_MAX_BYTES', 64 * 1024 * 1024))
+# redis: a lobby's history expires after this long without messages
+LOBBY_HISTORY_TTL = int(os.environ.get('LOBBY_HISTORY_TTL', 86400))
+
+STREAM_KEY = 'lobby:{}:history'
+SEQUENCE_KEY = 'lobby:{}:seq'
+
+# Numbers and stores a message in one step, so replicas never write sequence numbers out of order.
+# The message JSON is stored untouched next to its seq and merged with it in Python. The stream
+# entry ID is <seq>-0, which lets XRANGE start right after a sequence number.
+# KEYS[1] stream, KEYS[2] sequence counter; ARGV[1] message JSON without seq, ARGV[2] size, ARGV[3] TTL
+APPEND_SCRIPT = """
+local seq = redis.call('INCR', KEYS[2])
+redis.call('XADD', KEYS[1], 'MAXLEN', ARGV[2], seq .. '-0', 'seq', seq, 'message', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+def replay(messages, since_seq, last_seq):
+    """Build the lobby_history payload from the messages after since_seq."""
+    # A client ahead of us has history from before an eviction or expiry: send all we have
+    reset = since_seq > last_seq
+    if reset:
+        since_seq = 0
+    messages = [message for message in messages if message['seq'] > since_seq]
+    return {
+        'messages': messages,
+        'last_seq': last_seq,
+        'truncated': reset or bool(messages and messages[0]['seq'] > since_seq + 1)
+    }
+
+class LobbyHistory:
+    """Per-lobby ring buffers in memory, capped in total size with LRU eviction of lobbies."""
+
+    def __init__(self, size=LOBBY_HISTORY_SIZE, max_bytes=LOBBY_HISTORY_MAX_BYTES):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.lobbies = OrderedDict()  # lobby_id -> [last seq, deque of (message, bytes)], oldest used first
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def append(self, lobby_id, message):
+        """Store message and return it with its sequence number."""
+        with self.lock:
+            lobby = self.lobbies.get(lobby_id)
+            if lobby is None:
+                lobby = self.lobbies[lobby_id] = [0, deque()]
+            else:
+                self.lobbies.move_to_end(lobby_id)
+
+            lobby[0] += 1
+            message = dict(message, seq=lobby[0])
+            message_bytes = len(json.dumps(message))
+            lobby[1].append((message, message_bytes))
+            self.total_bytes += message_bytes
+            if len(lobby[1]) > self.size:
+                self.total_bytes -= lobby[1].popleft()[1]
+
+            while self.total_bytes > self.max_bytes and len(self.lobbies) > 1:
+                _, (_, evicted) = self.lobbies.popitem(last=False)
+                self.total_bytes -= sum(message_bytes for _, message_bytes in evicted)
+            return message
+
+    def since(self, lobby_id, since_seq):
+        with self.lock:
+            lobby = self.lobbies.get(lobby_id)
+            if lobby is None:
+                return replay([], since_seq, 0)
+            self.lobbies.move_to_end(lobby_id)
+            return replay([message for message, _ in lobby[1]], since_seq, lobby[0])
+
+class RedisLobbyHistory:
+    """Per-lobby Redis streams trimmed to the history size, shared by every replica."""
+
+    def __init__(self, redis_client, size=LOBBY_HISTORY_SIZE, ttl=LOBBY_HISTORY_TTL):
+        self.redis = redis_client
+        self.size = size
+        self.ttl = ttl
+        self.script = redis_client.register_script(APPEND_SCRIPT)
+
+    def append(self, lobby_id, message):
+        try:
+            seq = self.script(keys=[STREAM_KEY.format(lobby_id), SEQUENCE_KEY.format(lobby_id)],
+                              args=[json.dumps(message), self.size, self.ttl])
+        except redis.RedisError as e:
+            # Chat keeps working without history; the message just can't be replayed
+            print(f"Lobby history error: {str(e)}")
+            return dict(message, seq=None)
+        return dict(message, seq=int(seq))
+
+    def since(self, lobby_id, since_seq):
+        key = STREAM_KEY.format(lobby_id)
+        with self.redis.pipeline(transaction=True) as pipe:
+            pipe.get(SEQUENCE_KEY.format(lobby_id))
+            pipe.xrange(key, min=f'{since_seq + 1}-0')
+            last_seq, entries = pipe.execute()
+        last_seq = int(last_seq or 0)
+        if since_seq > last_seq:
+            entries = self.redis.xrange(key)
+        messages = [dict(json.loads(fields[b'message']), seq=int(fields[b'seq'])) for _, fields in entries]
+        return replay(messages, since_seq, last_seq)
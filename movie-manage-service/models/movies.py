@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from __main__ import db
+from extensions import db
 
 class Movie(db.Model):
     __tablename__ = 'movies'
@@ -9,7 +9,15 @@ class Movie(db.Model):
     description = db.Column(db.Text)
     release_date = db.Column(db.Date, nullable=False)
     rating = db.Column(db.Float, nullable=True)  # Set to nullable=True initially
+    genre = db.Column(db.String(100))
+    director = db.Column(db.String(255))
+    # Running aggregates maintained by the review write paths
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    average_rating = db.Column(db.Float, nullable=False, default=0, server_default='0')
     image_url = db.Column(db.String(255))
+    # The API calls it poster_url
+    poster_url = db.synonym('image_url')
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
     # Adding CheckConstraint directly
@@ -19,22 +27,21 @@ class Movie(db.Model):
 
     # Relationship to reviews
     reviews = db.relationship('Review', backref='movie', lazy=True)
-    
-    # Relationship to genres through the junction table
-    genres = db.relationship('Genre', secondary='movie_genres', backref=db.backref('movies', lazy='dynamic'))
 
 class Review(db.Model):
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Users live in the auth database, so there is no foreign key
+    user_id = db.Column(db.Integer, nullable=False)
     movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable=False)
-    review_text = db.Column(db.Text, nullable=False)
-    rating = db.Column(db.Integer, nullable=True)  # Set to nullable=True initially
+    # The API calls it comment
+    comment = db.Column('review_text', db.Text, nullable=False)
+    rating = db.Column(db.Float, nullable=True)  # Set to nullable=True initially
 
     # Adding CheckConstraint directly
     __table_args__ = (
-        db.CheckConstraint('rating >= 1 AND rating <= 10', name='check_review_rating'),
+        db.CheckConstraint('rating >= 0 AND rating <= 5', name='check_review_rating'),
     )
 
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
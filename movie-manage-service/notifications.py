@@ -0,0 +1,99 @@
+from prometheus_client import Counter
+import os
+import threading
+
+# movie_notification batching: 0 sends every notification as its own broadcast. Otherwise
+# notifications are collected for this many seconds (or until NOTIFICATION_BATCH_SIZE movies
+# are pending) and broadcast as one 'movie_notifications' frame holding a list.
+NOTIFICATION_BATCH_INTERVAL = float(os.environ.get('NOTIFICATION_BATCH_INTERVAL', 0))
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 100))
+
+class NotificationMetrics:
+    def __init__(self, registry):
+        self.notifications = Counter(
+            'movie_notifications',
+            'Movie notifications published',
+            registry=registry
+        )
+        self.merged = Counter(
+            'movie_notifications_merged',
+            'Movie notifications merged into a pending one for the same movie',
+            registry=registry
+        )
+        self.frames = Counter(
+            'movie_notification_frames',
+            'Movie notification broadcasts sent',
+            registry=registry
+        )
+        self.frames_saved = Counter(
+            'movie_notification_frames_saved',
+            'Movie notification broadcasts avoided by batching (each saves one write per client)',
+            registry=registry
+        )
+
+class NotificationBatcher:
+    """Broadcasts movie notifications, coalescing bursts into one frame per tick."""
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self.metrics = None
+        self.pending = {}  # movie_id -> notification, in arrival order
+        self.pending_count = 0
+        self.lock = threading.Lock()
+
+    def init_metrics(self, registry):
+        # Registered once; later app factory runs share the same registry
+        if self.metrics is None:
+            self.metrics = NotificationMetrics(registry)
+
+    def publish(self, notification):
+        if self.metrics:
+            self.metrics.notifications.inc()
+        if NOTIFICATION_BATCH_INTERVAL <= 0:
+            self.send('movie_notification', notification, 1)
+            return
+
+        with self.lock:
+            self.pending_count += 1
+            pending = self.pending.get(notification['movie_id'])
+            if pending is None:
+                self.pending[notification['movie_id']] = dict(notification)
+            else:
+                # A movie created and then updated within the tick is still new to clients
+                notification_type = pending['type']
+                pending.update(notification)
+                if notification_type == 'new':
+                    pending['type'] = 'new'
+                if self.metrics:
+                    self.metrics.merged.inc()
+            full = len(self.pending) >= NOTIFICATION_BATCH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            batch = list(self.pending.values())
+            count = self.pending_count
+            self.pending = {}
+            self.pending_count = 0
+        self.send('movie_notifications', batch, count)
+
+    def send(self, event, data, count):
+        self.socketio.emit(event, data)
+        if self.metrics:
+            self.metrics.frames.inc()
+            self.metrics.frames_saved.inc(count - 1)
+
+    def run(self):
+        while True:
+            self.socketio.sleep(NOTIFICATION_BATCH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Notification flush error: {str(e)}")
+
+    def start(self):
+        if NOTIFICATION_BATCH_INTERVAL > 0:
+            self.socketio.start_background_task(self.run)
@@ -0,0 +1,138 @@
+from engineio import packet as eio_packet
+from socketio import packet as sio_packet
+from prometheus_client import Counter, Gauge
+from process_metrics import gauge_function
+import os
+
+# Packets waiting to be written to one connection before it counts as a slow consumer
+OUTBOUND_QUEUE_SIZE = int(os.environ.get('SOCKETIO_OUTBOUND_QUEUE_SIZE', 1000))
+# drop_oldest discards that connection's oldest queued messages; disconnect closes it, and the
+# client catches up after reconnecting (join_lobby with since_seq)
+SLOW_CONSUMER_POLICY = os.environ.get('SOCKETIO_SLOW_CONSUMER_POLICY', 'disconnect')
+
+class OutboundMetrics:
+    def __init__(self, registry):
+        self.dropped = Counter(
+            'movie_socket_outbound_dropped',
+            'Queued socket messages dropped for slow consumers',
+            registry=registry
+        )
+        self.evictions = Counter(
+            'movie_socket_slow_consumer_evictions',
+            'Socket connections closed for falling too far behind',
+            registry=registry
+        )
+        self.depth = Gauge(
+            'movie_socket_outbound_queue_depth',
+            'Packets queued for all socket connections',
+            multiprocess_mode='livesum',
+            registry=registry
+        )
+        self.max_depth = Gauge(
+            'movie_socket_outbound_queue_max_depth',
+            'Packets queued for the most backed up socket connection',
+            multiprocess_mode='livemax',
+            registry=registry
+        )
+
+def is_plain_event(pkt):
+    """True for an Engine.IO message carrying a Socket.IO event that expects no ack.
+
+    Acks, connects, disconnects and binary events (whose attachments follow as separate
+    packets) must reach the client intact, so they are never dropped.
+    """
+    if pkt is None or pkt.packet_type != eio_packet.MESSAGE or not isinstance(pkt.data, str):
+        return False
+    data = pkt.data
+    if not data.startswith(str(sio_packet.EVENT)):
+        return False
+    data = data[1:]
+    if data.startswith('/'):
+        data = data.partition(',')[2]
+    # An ack id would come between the namespace and the payload
+    return data.startswith('[')
+
+class OutboundQueues:
+    """Bounds the Engine.IO queue each connection's writer drains.
+
+    Every packet the Socket.IO server sends goes through Engine.IO's send_packet, which is
+    wrapped here: once a connection has OUTBOUND_QUEUE_SIZE packets queued, the slow
+    consumer policy applies before the new packet is queued.
+    """
+
+    def __init__(self, size=OUTBOUND_QUEUE_SIZE, policy=SLOW_CONSUMER_POLICY):
+        if policy not in ('drop_oldest', 'disconnect'):
+            raise ValueError(f'Invalid slow consumer policy: {policy}')
+        self.size = size
+        self.policy = policy
+        self.metrics = None
+        self.eio = None
+        self.send_packet = None
+        self.evicting = set()
+
+    def init_app(self, socketio, registry):
+        self.eio = socketio.server.eio
+        self.send_packet = self.eio.send_packet
+        self.eio.send_packet = self.send_bounded
+        # Registered once; later app factory runs share the same registry, and the gauges
+        # read whichever server was wrapped last
+        if self.metrics is None:
+            self.metrics = OutboundMetrics(registry)
+            gauge_function(self.metrics.depth, lambda: sum(self.depths()))
+            gauge_function(self.metrics.max_depth, lambda: max(self.depths(), default=0))
+
+    def depths(self):
+        return [socket.queue.qsize() for socket in list(self.eio.sockets.values())]
+
+    def send_bounded(self, eio_sid, pkt):
+        socket = self.eio.sockets.get(eio_sid)
+        if socket is not None and not socket.closed and socket.queue.qsize() >= self.size:
+            if self.policy == 'disconnect':
+                self.evict(eio_sid, socket)
+                return
+            self.drop_oldest(socket)
+        self.send_packet(eio_sid, pkt)
+
+    def drop_oldest(self, socket):
+        queue_empty = self.eio.get_queue_empty_exception()
+        # Only plain events are dropped; everything else goes back in the queue
+        for _ in range(socket.queue.qsize()):
+            if socket.queue.qsize() < self.size:
+                return
+            try:
+                pkt = socket.queue.get(block=False)
+            except queue_empty:
+                return
+            socket.queue.task_done()
+            if is_plain_event(pkt):
+                self.metrics.dropped.inc()
+            else:
+                socket.queue.put(pkt)
+
+    def clear(self, socket):
+        queue_empty = self.eio.get_queue_empty_exception()
+        while True:
+            try:
+                socket.queue.get(block=False)
+            except queue_empty:
+                return
+            socket.queue.task_done()
+
+    def evict(self, eio_sid, socket):
+        if eio_sid in self.evicting:
+            return
+        self.evicting.add(eio_sid)
+        # Closing runs the disconnect handlers, which must not happen in the middle of a
+        # broadcast over the room being modified
+        self.eio.start_background_task(self.close, eio_sid, socket)
+
+    def close(self, eio_sid, socket):
+        self.evicting.discard(eio_sid)
+        if socket.closed or socket.closing:
+            return
+        print(f"Disconnecting slow consumer {eio_sid}: {socket.queue.qsize()} packets queued")
+        self.metrics.evictions.inc()
+        # Nothing more is sent to a client this far behind, not even its backlog or the close packet
+        self.clear(socket)
+        socket.close(wait=False, abort=True)
+        self.eio.sockets.pop(eio_sid, None)
@@ -1,117 +1,300 @@
-from flask import request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from __main__ import app, db, limiter, redis_client
-from models.movies import Movies
-from models.movies import Reviews
-from sqlalchemy import text
+from extensions import db, limiter, redis_client, metrics, health_checker
+from models.movies import Movie, Review
+from cache import get_or_compute, cache_get, cache_get_many, cache_versions, cache_set_if_unchanged, decode_text, \
+    invalidate, delete_versioned, flush_local_caches, VERSION_KEY
+from auth_client import get_user, update_user, user_exists, get_public_profiles
+from leaderboard import update_movie_score, update_movie_scores, remove_movie, rebuild_leaderboard, top_movie_ids
+from sqlalchemy import text, case, func, literal_column, update, insert, tuple_
+from datetime import datetime
 import requests
 import json
+import re
+
+movie_routes = Blueprint('movies', __name__, cli_group=None)
+
+# Pagination / streaming settings for the movie listing
+MOVIES_PAGE_DEFAULT_LIMIT = 50
+MOVIES_PAGE_MAX_LIMIT = 500
+MOVIES_STREAM_CHUNK_SIZE = 500
+
+# Full-text search settings. Each field is matched against its own GIN expression
+# index (see the create-search-index command); the weight scales its share of the rank.
+SEARCH_TEXT_CONFIG = literal_column("'simple'")
+SEARCH_FIELDS = {
+    'title': (Movie.title, 1.0),
+    'director': (Movie.director, 0.6),
+    'genre': (Movie.genre, 0.4)
+}
+SEARCH_PAGE_DEFAULT_LIMIT = 20
+SEARCH_PAGE_MAX_LIMIT = 100
+
+# Search results are cached under a generation number; bumping it orphans every
+# older entry at once and those simply age out through their TTL
+SEARCH_CACHE_GENERATION_KEY = 'search:movies:generation'
+SEARCH_CACHE_TTL = 300
+
+# Pre-encoded JSON per movie; list endpoints only fetch ids and hydrate from here
+MOVIE_FRAGMENT_KEY = 'movie:fragment:{}'
+MOVIE_FRAGMENT_TTL = 3600
+POPULAR_MOVIES_DEFAULT_LIMIT = 10
+POPULAR_MOVIES_MAX_LIMIT = 100
+
+REVIEW_BATCH_MAX_SIZE = 5000
+
+# Movie review listing and the cached rating summary
+REVIEWS_PAGE_DEFAULT_LIMIT = 50
+REVIEWS_PAGE_MAX_LIMIT = 500
+REVIEWS_STREAM_CHUNK_SIZE = 500
+REVIEW_SORT_ORDERS = ('id', 'created_at')
+REVIEW_SUMMARY_KEY = 'movie:{}:review_summary'
+REVIEW_SUMMARY_TTL = 300
+
+def serialize_movie(movie):
+    return {
+        'id': movie.id,
+        'title': movie.title,
+        'description': movie.description,
+        'release_date': movie.release_date.isoformat(),
+        'genre': movie.genre,
+        'director': movie.director,
+        'poster_url': movie.poster_url,
+        'average_rating': movie.average_rating
+    }
+
+def serialize_review(review):
+    return {
+        'id': review.id,
+        'movie_id': review.movie_id,
+        'user_id': review.user_id,
+        'rating': review.rating,
+        'comment': review.comment,
+        'created_at': review.created_at.isoformat()
+    }
+
+def stream_json_array(query, encode, chunk_size):
+    """Stream the rows of query as one JSON array, written out in chunks of chunk_size rows."""
+    def generate():
+        yield '['
+        separator = ''
+        chunk = []
+        for row in query.yield_per(chunk_size):
+            chunk.append(encode(row))
+            if len(chunk) >= chunk_size:
+                yield separator + ','.join(chunk)
+                separator = ','
+                chunk = []
+        if chunk:
+            yield separator + ','.join(chunk)
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def encode_movie(movie):
+    return json.dumps(serialize_movie(movie))
+
+def hydrate_movies(movie_ids):
+    """Return the encoded JSON fragment of each movie id, in order.
+
+    Fragments come from the local tier or a single MGET; misses are loaded in one query and
+    written back through a pipeline. Ids that no longer exist are skipped.
+    """
+    if not movie_ids:
+        return []
+
+    cached = cache_get_many([MOVIE_FRAGMENT_KEY.format(movie_id) for movie_id in movie_ids], decode=decode_text)
+    fragments = {movie_id: cached[MOVIE_FRAGMENT_KEY.format(movie_id)] for movie_id in movie_ids}
+
+    missing = [movie_id for movie_id, fragment in fragments.items() if fragment is None]
+    if missing:
+        # Versions are read before the query, so a write committing meanwhile wins over our backfill
+        versions = dict(zip(missing, cache_versions([MOVIE_FRAGMENT_KEY.format(movie_id) for movie_id in missing])))
+        backfill = []
+        for movie in Movie.query.filter(Movie.id.in_(missing)):
+            fragment = encode_movie(movie)
+            fragments[movie.id] = fragment
+            backfill.append((MOVIE_FRAGMENT_KEY.format(movie.id), fragment, versions[movie.id]))
+        cache_set_if_unchanged(backfill, MOVIE_FRAGMENT_TTL, encode=str)
+
+    return [fragments[movie_id] for movie_id in movie_ids if fragments[movie_id] is not None]
+
+def fragments_response(fragments, **fields):
+    # Splice the pre-encoded fragments into the body instead of decoding and re-encoding them.
+    # Without extra fields the body is a bare array, otherwise it is wrapped as {..., "data": [...]}
+    body = '[' + ','.join(fragments) + ']'
+    if fields:
+        body = json.dumps(fields)[:-1] + ', "data": ' + body + '}'
+    return Response(body, mimetype='application/json')
+
+def search_document(column):
+    # Must stay identical to the indexed expression so the planner can use the GIN index
+    return func.to_tsvector(SEARCH_TEXT_CONFIG, func.coalesce(column, literal_column("''")))
+
+def build_prefix_tsquery(term):
+    # Tokenize the user input ourselves so no tsquery syntax leaks through,
+    # and make every token a prefix match ("star wa" -> "star:* & wa:*")
+    tokens = re.findall(r'\w+', term.lower())
+    if not tokens:
+        return None
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+def search_cache_generation():
+    return int(cache_get(SEARCH_CACHE_GENERATION_KEY) or 0)
+
+def invalidate_search_cache():
+    redis_client.incr(SEARCH_CACHE_GENERATION_KEY)
+    invalidate(SEARCH_CACHE_GENERATION_KEY, remote=False)
+
+def apply_rating_delta(movie_id, rating_delta, count_delta):
+    # Adjust the running aggregates in SQL so concurrent writers don't clobber each other.
+    # Every right-hand side sees the pre-update row, so the average uses the new totals.
+    # Returns the movie's (average_rating, genre) after the change, or None if it doesn't exist.
+    new_sum = Movie.rating_sum + rating_delta
+    new_count = Movie.review_count + count_delta
+    result = db.session.execute(
+        update(Movie)
+        .where(Movie.id == movie_id)
+        .values({
+            Movie.rating_sum: new_sum,
+            Movie.review_count: new_count,
+            Movie.average_rating: case((new_count > 0, new_sum / new_count), else_=0)
+        })
+        .returning(Movie.average_rating, Movie.genre),
+        execution_options={'synchronize_session': False}
+    )
+    return result.first()
 
-LOGIN_SERVICE_URL = 'http://login-service:5000/api/'
+# Status endpoints, probed several times a second: they serve the health checker's last result
+@movie_routes.route('/api/movies/status', methods=['GET'])
+@limiter.exempt
+@metrics.do_not_track()
+def service_status():
+    return health_checker.readiness()
+
+@movie_routes.route('/api/movies/status/live', methods=['GET'])
+@limiter.exempt
+@metrics.do_not_track()
+def service_liveness():
+    return health_checker.liveness()
 
 # Movie routes
 
-@app.route('/api/movies/<int:id>', methods=['GET'])
+@movie_routes.route('/api/movies/<int:id>', methods=['GET'])
 def get_movie(id):
-    movie = Movies.query.get(id)
-    if movie:
-        return jsonify({
-            'id': movie.id,
-            'title': movie.title,
-            'description': movie.description,
-            'release_date': movie.release_date.isoformat(),
-            'genre': movie.genre,
-            'director': movie.director,
-            'poster_url': movie.poster_url,
-            'average_rating': movie.average_rating
-        })
+    fragments = hydrate_movies([id])
+    if fragments:
+        return Response(fragments[0], mimetype='application/json')
     else:
         return jsonify({'message': 'Movie not found'}), 404
 
-@app.route('/api/movies/', methods=['GET'])
+@movie_routes.route('/api/movies/', methods=['GET'])
 def get_all_movies():
-    movies = Movies.query.all()
-    return jsonify([{
-        'id': movie.id,
-        'title': movie.title,
-        'description': movie.description,
-        'release_date': movie.release_date.isoformat(),
-        'genre': movie.genre,
-        'director': movie.director,
-        'poster_url': movie.poster_url,
-        'average_rating': movie.average_rating
-    } for movie in movies])
+    after_id = request.args.get('after_id')
+    limit = request.args.get('limit')
 
-@app.route('/api/movies/popular', methods=['GET'])
-def get_popular_movies():
-    cache_key = 'popular_movies'
+    # Keyset pagination: only when the client asks for a page
+    if after_id is not None or limit is not None:
+        try:
+            after_id = int(after_id) if after_id is not None else 0
+            limit = int(limit) if limit is not None else MOVIES_PAGE_DEFAULT_LIMIT
+        except ValueError:
+            return jsonify({'message': 'after_id and limit must be integers'}), 400
 
-    cached_results = redis_client.get(cache_key)
-    if cached_results:
-        return jsonify(message='Results retrieved from cache', data=json.loads(cached_results))
+        if limit < 1:
+            return jsonify({'message': 'limit must be a positive integer'}), 400
+        limit = min(limit, MOVIES_PAGE_MAX_LIMIT)
 
-    movies = Movies.query.order_by(Movies.average_rating.desc()).limit(10).all()
+        # Fetch one extra id to know whether there is a next page
+        movie_ids = [row.id for row in db.session.query(Movie.id)
+                     .filter(Movie.id > after_id)
+                     .order_by(Movie.id)
+                     .limit(limit + 1)]
+        has_more = len(movie_ids) > limit
+        movie_ids = movie_ids[:limit]
 
-    response_data = [{
-        'id': movie.id,
-        'title': movie.title,
-        'description': movie.description,
-        'release_date': movie.release_date.isoformat(),
-        'genre': movie.genre,
-        'director': movie.director,
-        'poster_url': movie.poster_url,
-        'average_rating': movie.average_rating
-    } for movie in movies]
+        return fragments_response(
+            hydrate_movies(movie_ids),
+            next_after_id=movie_ids[-1] if has_more else None
+        )
+
+    # Full listing: stream the JSON array in chunks from a server-side cursor
+    return stream_json_array(Movie.query.order_by(Movie.id), encode_movie, MOVIES_STREAM_CHUNK_SIZE)
+
+@movie_routes.route('/api/movies/popular', methods=['GET'])
+def get_popular_movies():
+    genre = request.args.get('genre')
+
+    try:
+        limit = int(request.args.get('limit', POPULAR_MOVIES_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'message': 'limit and offset must be integers'}), 400
 
-    redis_client.set(cache_key, json.dumps(response_data), ex=300)
+    if limit < 1 or offset < 0:
+        return jsonify({'message': 'limit must be positive and offset non-negative'}), 400
+    limit = min(limit, POPULAR_MOVIES_MAX_LIMIT)
 
-    return jsonify(response_data)
+    # Served straight from the sorted-set leaderboard kept current by the review writes
+    movie_ids = top_movie_ids(limit, offset, genre)
 
-@app.route('/api/movies/search', methods=['GET'])
+    return fragments_response(hydrate_movies(movie_ids))
+
+@movie_routes.route('/api/movies/search', methods=['GET'])
+@limiter.limit('120/minute')
 def search_movies():
     title = request.args.get('title')
     genre = request.args.get('genre')
     director = request.args.get('director')
     min_rating = request.args.get('min_rating')
 
-    cache_key = f"search:movies:title={title}&genre={genre}&director={director}&min_rating={min_rating}"
+    try:
+        limit = int(request.args.get('limit', SEARCH_PAGE_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'message': 'limit and offset must be integers'}), 400
+
+    if limit < 1 or offset < 0:
+        return jsonify({'message': 'limit must be positive and offset non-negative'}), 400
+    limit = min(limit, SEARCH_PAGE_MAX_LIMIT)
 
-    cached_results = redis_client.get(cache_key)
-    if cached_results:
-        return jsonify(message='Results retrieved from cache', data=json.loads(cached_results))
+    query = db.session.query(Movie.id)
+    rank = None
 
-    query = Movies.query
+    terms = {'title': title, 'genre': genre, 'director': director}
+    for field, (column, weight) in SEARCH_FIELDS.items():
+        tsquery_text = build_prefix_tsquery(terms[field]) if terms[field] else None
+        if not tsquery_text:
+            continue
+
+        document = search_document(column)
+        tsquery = func.to_tsquery(SEARCH_TEXT_CONFIG, tsquery_text)
+        query = query.filter(document.op('@@')(tsquery))
+
+        field_rank = func.ts_rank(document, tsquery) * weight
+        rank = field_rank if rank is None else rank + field_rank
 
-    if title:
-        query = query.filter(Movies.title.ilike(f'%{title}%'))
-    if genre:
-        query = query.filter(Movies.genre.ilike(f'%{genre}%'))
-    if director:
-        query = query.filter(Movies.director.ilike(f'%{director}%'))
     if min_rating:
         try:
-            query = query.filter(Movies.average_rating >= float(min_rating))
+            query = query.filter(Movie.average_rating >= float(min_rating))
         except ValueError:
             return jsonify({'message': 'Invalid min_rating format'}), 400
 
-    movies = query.all()
+    if rank is not None:
+        query = query.order_by(rank.desc(), Movie.id)
+    else:
+        query = query.order_by(Movie.id)
 
-    response_data = [{
-        'id': movie.id,
-        'title': movie.title,
-        'description': movie.description,
-        'release_date': movie.release_date.isoformat(),
-        'genre': movie.genre,
-        'director': movie.director,
-        'poster_url': movie.poster_url,
-        'average_rating': movie.average_rating
-    } for movie in movies]
+    cache_key = f"search:movies:ids:gen={search_cache_generation()}:title={title}&genre={genre}&director={director}&min_rating={min_rating}&limit={limit}&offset={offset}"
 
-    redis_client.set(cache_key, json.dumps(response_data), ex=300)
+    movie_ids, from_cache = get_or_compute(cache_key, lambda: [row.id for row in query.offset(offset).limit(limit)],
+                                           ttl=SEARCH_CACHE_TTL, name='search')
+    if from_cache:
+        return fragments_response(hydrate_movies(movie_ids), message='Results retrieved from cache')
 
-    return jsonify(response_data)
+    return fragments_response(hydrate_movies(movie_ids))
 
-@app.route('/api/movies/', methods=['POST'])
+@movie_routes.route('/api/movies/', methods=['POST'])
 @jwt_required()
 def post_movie():
     data = request.get_json()
@@ -121,7 +304,7 @@ def post_movie():
         if not data.get(field):
             return jsonify({'message': f'Missing required field: {field}'}), 400
 
-    new_movie = Movies(
+    new_movie = Movie(
         title=data.get('title'),
         description=data.get('description'),
         release_date=data.get('release_date'),
@@ -133,22 +316,20 @@ def post_movie():
     db.session.add(new_movie)
     db.session.commit()
 
-    redis_client.delete('popular_movies')
-
-    search_pattern = 'search:movies:*'
-    for key in redis_client.scan_iter(search_pattern):
-        redis_client.delete(key)
+    update_movie_score(new_movie.id, new_movie.genre, 0)
+    invalidate_search_cache()
 
     return jsonify({'message': 'Movie created', 'id': new_movie.id}), 201
 
-@app.route('/api/movies/<int:id>', methods=['PUT'])
+@movie_routes.route('/api/movies/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_movie(id):
-    movie = Movies.query.get(id)
+    movie = Movie.query.get(id)
     if not movie:
         return jsonify({'message': 'Movie not found'}), 404
 
     data = request.get_json()
+    old_genre = movie.genre
 
     if 'title' in data:
         movie.title = data['title']
@@ -163,77 +344,146 @@ def update_movie(id):
     if 'poster_url' in data:
         movie.poster_url = data['poster_url']
 
+    genre, average_rating = movie.genre, movie.average_rating
     db.session.commit()
 
-    redis_client.delete('popular_movies')
-
-    search_pattern = 'search:movies:*'
-    for key in redis_client.scan_iter(search_pattern):
-        redis_client.delete(key)
+    if genre != old_genre:
+        update_movie_score(id, genre, average_rating, old_genre)
+    invalidate(MOVIE_FRAGMENT_KEY.format(id))
+    invalidate_search_cache()
 
     return jsonify({'message': 'Movie updated successfully'}), 200
 
-@app.route('/api/movies/<int:id>', methods=['DELETE'])
+@movie_routes.route('/api/movies/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_movie(id):
-    movie = Movies.query.get(id)
+    movie = Movie.query.get(id)
     if not movie:
         return jsonify({'message': 'Movie not found'}), 404
 
+    genre = movie.genre
     db.session.delete(movie)
     db.session.commit()
 
-    redis_client.delete('popular_movies')
-
-    search_pattern = 'search:movies:*'
-    for key in redis_client.scan_iter(search_pattern):
-        redis_client.delete(key)
+    remove_movie(id, genre)
+    invalidate(MOVIE_FRAGMENT_KEY.format(id), REVIEW_SUMMARY_KEY.format(id))
+    invalidate_search_cache()
 
     return jsonify({'message': 'Movie deleted successfully'}), 200
 
 # Review routes
 
-@app.route('/api/reviews/<int:id>', methods=['GET'])
+@movie_routes.route('/api/reviews/<int:id>', methods=['GET'])
 def get_review(id):
-    review = Reviews.query.get(id)
+    review = Review.query.get(id)
     if review:
-        return jsonify({
-            'id': review.id,
-            'movie_id': review.movie_id,
-            'user_id': review.user_id,
-            'rating': review.rating,
-            'comment': review.comment,
-            'created_at': review.created_at.isoformat()
-        })
+        return jsonify(serialize_review(review))
     else:
         return jsonify({'message': 'Review not found'}), 404
 
-@app.route('/api/movies/<int:movie_id>/reviews', methods=['GET'])
+@movie_routes.route('/api/movies/<int:movie_id>/reviews', methods=['GET'])
 def get_movie_reviews(movie_id):
-    reviews = Reviews.query.filter_by(movie_id=movie_id).all()
-    return jsonify([{
-        'id': review.id,
-        'movie_id': review.movie_id,
-        'user_id': review.user_id,
-        'rating': review.rating,
-        'comment': review.comment,
-        'created_at': review.created_at.isoformat()
-    } for review in reviews])
+    sort = request.args.get('sort')
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit')
+
+    query = Review.query.filter_by(movie_id=movie_id)
+
+    # Without paging parameters keep returning the whole list, streamed from a server-side cursor
+    if sort is None and cursor is None and limit is None:
+        return stream_json_array(query.order_by(Review.id),
+                                 lambda review: json.dumps(serialize_review(review)),
+                                 REVIEWS_STREAM_CHUNK_SIZE)
+
+    sort = sort or 'id'
+    if sort not in REVIEW_SORT_ORDERS:
+        return jsonify({'message': f"sort must be one of: {', '.join(REVIEW_SORT_ORDERS)}"}), 400
+
+    try:
+        limit = int(limit) if limit is not None else REVIEWS_PAGE_DEFAULT_LIMIT
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'message': 'limit must be a positive integer'}), 400
+    limit = min(limit, REVIEWS_PAGE_MAX_LIMIT)
 
-@app.route('/api/reviews/', methods=['POST'])
+    # id: oldest first, cursor is the last id seen.
+    # created_at: newest first, cursor is "<created_at iso>|<id>" of the last review seen.
+    try:
+        if sort == 'id':
+            if cursor:
+                query = query.filter(Review.id > int(cursor))
+            query = query.order_by(Review.id)
+        else:
+            if cursor:
+                created_at, review_id = cursor.rsplit('|', 1)
+                query = query.filter(tuple_(Review.created_at, Review.id) <
+                                     tuple_(datetime.fromisoformat(created_at), int(review_id)))
+            query = query.order_by(Review.created_at.desc(), Review.id.desc())
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor'}), 400
+
+    # Fetch one extra row to know whether there is a next page
+    reviews = query.limit(limit + 1).all()
+    has_more = len(reviews) > limit
+    reviews = reviews[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = reviews[-1]
+        next_cursor = str(last.id) if sort == 'id' else f'{last.created_at.isoformat()}|{last.id}'
+
+    # Hydrate reviewer usernames for the whole page in one call; the page is still useful without them
+    try:
+        profiles = get_public_profiles(review.user_id for review in reviews)
+    except (requests.RequestException, KeyError, ValueError):
+        profiles = {}
+
+    data = []
+    for review in reviews:
+        review_data = serialize_review(review)
+        review_data['username'] = profiles.get(review.user_id, {}).get('username')
+        data.append(review_data)
+
+    return jsonify({
+        'data': data,
+        'next_cursor': next_cursor
+    })
+
+@movie_routes.route('/api/movies/<int:movie_id>/reviews/summary', methods=['GET'])
+def get_movie_reviews_summary(movie_id):
+    def load_summary():
+        rows = db.session.query(Review.rating, func.count(Review.id)) \
+            .filter(Review.movie_id == movie_id) \
+            .group_by(Review.rating) \
+            .order_by(Review.rating) \
+            .all()
+        count = sum(row_count for _, row_count in rows)
+        total = sum(rating * row_count for rating, row_count in rows)
+        return {
+            'movie_id': movie_id,
+            'count': count,
+            'mean': total / count if count else 0,
+            'histogram': {f'{rating:g}': row_count for rating, row_count in rows}
+        }
+
+    summary, _ = get_or_compute(REVIEW_SUMMARY_KEY.format(movie_id), load_summary,
+                                ttl=REVIEW_SUMMARY_TTL, name='review_summary')
+    return jsonify(summary)
+
+@movie_routes.route('/api/reviews/', methods=['POST'])
+@limiter.limit('30/minute')
 @jwt_required()
 def post_review():
     data = request.get_json()
     user_id = get_jwt_identity()
     
     # Check if the user exists
-    headers = {
-        'Authorization': f'{request.headers.get("Authorization")}'
-    }
-    user_response = requests.get(f'{LOGIN_SERVICE_URL}/users/{user_id}', headers=headers)
-    
-    if user_response.status_code != 200:
-        return jsonify({'message': 'User not found or unauthorized'}), 401
+    try:
+        if not user_exists(user_id, request.headers.get('Authorization')):
+            return jsonify({'message': 'User not found or unauthorized'}), 401
+    except requests.RequestException:
+        return jsonify({'message': 'Authentication service unavailable'}), 503
     
     required_fields = ['movie_id', 'rating', 'comment']
     for field in required_fields:
@@ -247,30 +497,121 @@ def post_review():
     except ValueError:
         return jsonify({'message': 'Rating must be a number'}), 400
 
-    new_review = Reviews(
+    new_review = Review(
         movie_id=data.get('movie_id'),
         user_id=user_id,
         rating=rating,
         comment=data.get('comment')
     )
     db.session.add(new_review)
-    db.session.commit()
 
-    # Update movie's average rating
-    movie = Movies.query.get(data.get('movie_id'))
-    if movie:
-        reviews = Reviews.query.filter_by(movie_id=movie.id).all()
-        movie.average_rating = sum(review.rating for review in reviews) / len(reviews)
-        db.session.commit()
+    # Update movie's rating aggregates in the same transaction
+    movie_id = new_review.movie_id
+    movie_rating = apply_rating_delta(movie_id, rating, 1)
+    db.session.commit()
 
-    redis_client.delete('popular_movies')
+    if movie_rating:
+        update_movie_score(movie_id, movie_rating.genre, movie_rating.average_rating)
+    invalidate(MOVIE_FRAGMENT_KEY.format(movie_id), REVIEW_SUMMARY_KEY.format(movie_id))
 
     return jsonify({'message': 'Review created', 'id': new_review.id}), 201
 
-@app.route('/api/reviews/<int:id>', methods=['PUT'])
+@movie_routes.route('/api/reviews/batch', methods=['POST'])
+@limiter.limit('5/minute')
+@jwt_required()
+def post_reviews_batch():
+    data = request.get_json()
+    user_id = get_jwt_identity()
+
+    items = data.get('reviews') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'Missing required field: reviews'}), 400
+    if len(items) > REVIEW_BATCH_MAX_SIZE:
+        return jsonify({'message': f'A batch can hold at most {REVIEW_BATCH_MAX_SIZE} reviews'}), 400
+
+    # Check if the user exists, once for the whole batch
+    try:
+        if not user_exists(user_id, request.headers.get('Authorization')):
+            return jsonify({'message': 'User not found or unauthorized'}), 401
+    except requests.RequestException:
+        return jsonify({'message': 'Authentication service unavailable'}), 503
+
+    # Validate every item, then check all referenced movies with one query
+    errors = []
+    candidates = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'message': 'Review must be an object'})
+            continue
+
+        missing = next((field for field in ['movie_id', 'rating', 'comment'] if not item.get(field)), None)
+        if missing:
+            errors.append({'index': index, 'message': f'Missing required field: {missing}'})
+            continue
+
+        try:
+            movie_id = int(item['movie_id'])
+            rating = float(item['rating'])
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'message': 'movie_id must be an integer and rating a number'})
+            continue
+        if rating < 0 or rating > 5:
+            errors.append({'index': index, 'message': 'Rating must be between 0 and 5'})
+            continue
+
+        candidates.append((index, movie_id, rating, item['comment']))
+
+    requested_ids = {movie_id for _, movie_id, _, _ in candidates}
+    existing_ids = {row.id for row in db.session.query(Movie.id).filter(Movie.id.in_(requested_ids))} \
+        if requested_ids else set()
+
+    rows = []
+    indexes = []
+    for index, movie_id, rating, comment in candidates:
+        if movie_id not in existing_ids:
+            errors.append({'index': index, 'message': 'Movie not found'})
+            continue
+        rows.append({'movie_id': movie_id, 'user_id': user_id, 'rating': rating, 'comment': comment})
+        indexes.append(index)
+
+    if not rows:
+        return jsonify({'message': 'No valid reviews in batch', 'created': [], 'errors': errors}), 400
+
+    # One multi-row insert, then one aggregate update per affected movie, all in one transaction
+    result = db.session.execute(
+        insert(Review).returning(Review.id, sort_by_parameter_order=True),
+        rows
+    )
+    review_ids = [row.id for row in result]
+
+    deltas = {}
+    for row in rows:
+        rating_sum, count = deltas.get(row['movie_id'], (0, 0))
+        deltas[row['movie_id']] = (rating_sum + row['rating'], count + 1)
+
+    scores = []
+    for movie_id, (rating_sum, count) in deltas.items():
+        movie_rating = apply_rating_delta(movie_id, rating_sum, count)
+        if movie_rating:
+            scores.append((movie_id, movie_rating.genre, movie_rating.average_rating))
+
+    db.session.commit()
+
+    update_movie_scores(scores)
+    invalidate(*[key for movie_id in deltas
+                 for key in (MOVIE_FRAGMENT_KEY.format(movie_id), REVIEW_SUMMARY_KEY.format(movie_id))])
+
+    errors.sort(key=lambda error: error['index'])
+    return jsonify({
+        'message': f'{len(review_ids)} reviews created',
+        'created': [{'index': index, 'id': review_id} for index, review_id in zip(indexes, review_ids)],
+        'errors': errors
+    }), 201
+
+@movie_routes.route('/api/reviews/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_review(id):
-    review = Reviews.query.get(id)
+    review = Review.query.get(id)
     if not review:
         return jsonify({'message': 'Review not found'}), 404
 
@@ -278,6 +619,7 @@ def update_review(id):
         return jsonify({'message': 'Unauthorized to update this review'}), 403
 
     data = request.get_json()
+    old_rating = review.rating
 
     if 'rating' in data:
         try:
@@ -290,23 +632,24 @@ def update_review(id):
     if 'comment' in data:
         review.comment = data['comment']
 
-    db.session.commit()
+    # Update movie's rating aggregates in the same transaction
+    movie_id = review.movie_id
+    movie_rating = None
+    if review.rating != old_rating:
+        movie_rating = apply_rating_delta(movie_id, review.rating - old_rating, 0)
 
-    # Update movie's average rating
-    movie = Movies.query.get(review.movie_id)
-    if movie:
-        reviews = Reviews.query.filter_by(movie_id=movie.id).all()
-        movie.average_rating = sum(review.rating for review in reviews) / len(reviews)
-        db.session.commit()
+    db.session.commit()
 
-    redis_client.delete('popular_movies')
+    if movie_rating:
+        update_movie_score(movie_id, movie_rating.genre, movie_rating.average_rating)
+    invalidate(MOVIE_FRAGMENT_KEY.format(movie_id), REVIEW_SUMMARY_KEY.format(movie_id))
 
     return jsonify({'message': 'Review updated successfully'}), 200
 
-@app.route('/api/reviews/<int:id>', methods=['DELETE'])
+@movie_routes.route('/api/reviews/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_review(id):
-    review = Reviews.query.get(id)
+    review = Review.query.get(id)
     if not review:
         return jsonify({'message': 'Review not found'}), 404
 
@@ -315,53 +658,46 @@ def delete_review(id):
 
     movie_id = review.movie_id
     db.session.delete(review)
-    db.session.commit()
 
-    # Update movie's average rating
-    movie = Movies.query.get(movie_id)
-    if movie:
-        reviews = Reviews.query.filter_by(movie_id=movie.id).all()
-        if reviews:
-            movie.average_rating = sum(review.rating for review in reviews) / len(reviews)
-        else:
-            movie.average_rating = 0
-        db.session.commit()
+    # Update movie's rating aggregates in the same transaction
+    movie_rating = apply_rating_delta(movie_id, -review.rating, -1)
+    db.session.commit()
 
-    redis_client.delete('popular_movies')
+    if movie_rating:
+        update_movie_score(movie_id, movie_rating.genre, movie_rating.average_rating)
+    invalidate(MOVIE_FRAGMENT_KEY.format(movie_id), REVIEW_SUMMARY_KEY.format(movie_id))
 
     return jsonify({'message': 'Review deleted successfully'}), 200
 
 # User profile routes
 
-@app.route('/api/movies/profile', methods=['GET'])
+@movie_routes.route('/api/movies/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     user_id = get_jwt_identity()
     
-    headers = {
-        'Authorization': f'{request.headers.get("Authorization")}'
-    }
-    
     # Send a GET request to the login service to fetch the user profile
-    profile_response = requests.get(f'{LOGIN_SERVICE_URL}/users/{user_id}', headers=headers)
+    try:
+        profile_response = get_user(user_id, request.headers.get('Authorization'))
+    except requests.RequestException:
+        return jsonify({'message': 'Authentication service unavailable'}), 503
     
     if profile_response.status_code != 200:
         return jsonify({'message': profile_response.json().get('message', 'Error occurred')}), profile_response.status_code
     
     return jsonify(profile_response.json()), 200
 
-@app.route('/api/movies/profile', methods=['PUT'])
+@movie_routes.route('/api/movies/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
     user_id = get_jwt_identity()
     data = request.get_json()
 
-    headers = {
-        'Authorization': f'{request.headers.get("Authorization")}'
-    }
-
     # Send a PUT request to the login service to update the user profile
-    update_response = requests.put(f'{LOGIN_SERVICE_URL}/users/{user_id}', json=data, headers=headers)
+    try:
+        update_response = update_user(user_id, data, request.headers.get('Authorization'))
+    except requests.RequestException:
+        return jsonify({'message': 'Authentication service unavailable'}), 503
     
     if update_response.status_code != 200:
         return jsonify({'message': update_response.json().get('message', 'Error occurred')}), update_response.status_code
@@ -371,7 +707,61 @@ def update_profile():
     else:
         return jsonify({'message': 'Profile updated successfully'}), 200
 
-@app.route('/api/movies/cache/clear', methods=['DELETE'])
+# Maintenance commands
+
+@movie_routes.cli.command('reconcile-ratings')
+def reconcile_ratings():
+    """Rebuild rating_sum, review_count and average_rating for every movie from the reviews table."""
+    result = db.session.execute(text("""
+        UPDATE movies AS m
+        SET rating_sum = agg.rating_sum,
+            review_count = agg.review_count,
+            average_rating = COALESCE(CAST(agg.rating_sum AS FLOAT) / NULLIF(agg.review_count, 0), 0)
+        FROM (
+            SELECT movies.id AS movie_id,
+                   COALESCE(SUM(reviews.rating), 0) AS rating_sum,
+                   COUNT(reviews.id) AS review_count
+            FROM movies
+            LEFT JOIN reviews ON reviews.movie_id = movies.id
+            GROUP BY movies.id
+        ) AS agg
+        WHERE m.id = agg.movie_id
+          AND (m.rating_sum IS DISTINCT FROM agg.rating_sum
+               OR m.review_count IS DISTINCT FROM agg.review_count)
+    """))
+    db.session.commit()
+
+    # Averages may have moved for any movie, so drop every cached fragment
+    pipeline = redis_client.pipeline(transaction=False)
+    for key in map(decode_text, redis_client.scan_iter(MOVIE_FRAGMENT_KEY.format('*'))):
+        if not key.endswith(VERSION_KEY.format('')):
+            delete_versioned(pipeline, [key])
+    pipeline.execute()
+    flush_local_caches()
+    rebuild_leaderboard()
+
+    print(f"Reconciled rating aggregates for {result.rowcount} movies")
+
+@movie_routes.cli.command('rebuild-leaderboard')
+def rebuild_leaderboard_command():
+    """Reseed the global and per-genre popularity leaderboards from the database."""
+    count = rebuild_leaderboard()
+    print(f"Leaderboard rebuilt with {count} movies")
+
+@movie_routes.cli.command('create-search-index')
+def create_search_index():
+    """Create the GIN full-text indexes used by /api/movies/search."""
+    for field in SEARCH_FIELDS:
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_movies_{field}_fts ON movies "
+            f"USING GIN (to_tsvector('simple', COALESCE({field}, '')))"
+        ))
+    db.session.commit()
+
+    print(f"Search indexes ready for: {', '.join(SEARCH_FIELDS)}")
+
+@movie_routes.route('/api/movies/cache/clear', methods=['DELETE'])
 def clear_all_cache():
     redis_client.flushall()
+    flush_local_caches()
     return jsonify({'message': 'All cache cleared successfully'}), 200
@@ -0,0 +1,196 @@
+from socketio import PubSubManager
+from collections import defaultdict
+import queue
+import threading
+import time
+
+# Redis keys/channels used to fan Socket.IO events out across replicas
+ROOM_NODES_KEY = 'socketio:room:{}:{}'  # namespace, room -> set of node ids with members in it
+NODE_CHANNEL = '{}:node:{}'  # channel, node id
+LISTEN_RETRY_MAX = 30
+
+class RedisBackend:
+    """Pub/sub and room-to-node bookkeeping in Redis, shared by every replica."""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    def publish(self, channel, data):
+        return self.redis.publish(channel, data)
+
+    def listen(self, channels):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*channels)
+        try:
+            for message in pubsub.listen():
+                if message['type'] == 'message':
+                    yield message['data']
+        finally:
+            pubsub.close()
+
+    def add_room_node(self, key, node_id):
+        self.redis.sadd(key, node_id)
+
+    def remove_room_node(self, key, node_id):
+        self.redis.srem(key, node_id)
+
+    def room_nodes(self, key):
+        return {node_id.decode() if isinstance(node_id, bytes) else node_id
+                for node_id in self.redis.smembers(key)}
+
+class LocalBackend:
+    """In-process stand-in for RedisBackend. Managers sharing one instance behave like separate nodes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(list)  # channel -> queues
+        self.rooms = defaultdict(set)
+
+    def publish(self, channel, data):
+        with self.lock:
+            subscribers = list(self.subscribers[channel])
+        for subscriber in subscribers:
+            subscriber.put(data)
+        return len(subscribers)
+
+    def listen(self, channels):
+        subscriber = queue.Queue()
+        with self.lock:
+            for channel in channels:
+                self.subscribers[channel].append(subscriber)
+        try:
+            while True:
+                yield subscriber.get()
+        finally:
+            with self.lock:
+                for channel in channels:
+                    self.subscribers[channel].remove(subscriber)
+
+    def add_room_node(self, key, node_id):
+        with self.lock:
+            self.rooms[key].add(node_id)
+
+    def remove_room_node(self, key, node_id):
+        with self.lock:
+            nodes = self.rooms.get(key)
+            if nodes is not None:
+                nodes.discard(node_id)
+                if not nodes:
+                    del self.rooms[key]
+
+    def room_nodes(self, key):
+        with self.lock:
+            return set(self.rooms.get(key, ()))
+
+class RoomRoutedManager(PubSubManager):
+    """Socket.IO client manager that fans events out to the other replicas.
+
+    Each node records in the backend which rooms it has members in. An emit to a room
+    is published only on the channels of nodes holding members of that room; broadcasts
+    and control messages go to every node. A node that no longer receives its channel
+    (PUBLISH reaches nobody) is dropped from the room.
+    """
+
+    name = 'room-routed'
+
+    def __init__(self, backend, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.backend = backend
+        self.node_channel = NODE_CHANNEL.format(channel, self.host_id)
+
+    # Room membership: the backend only changes when a room gains its first or loses its
+    # last member on this node
+
+    def basic_enter_room(self, sid, namespace, room, eio_sid=None):
+        first_member = room is not None and room != sid and room not in self.rooms.get(namespace, {})
+        super().basic_enter_room(sid, namespace, room, eio_sid=eio_sid)
+        if first_member:
+            self.update_room_node(namespace, room, joined=True)
+
+    def basic_leave_room(self, sid, namespace, room):
+        super().basic_leave_room(sid, namespace, room)
+        if room is not None and room != sid and room not in self.rooms.get(namespace, {}):
+            self.update_room_node(namespace, room, joined=False)
+
+    def update_room_node(self, namespace, room, joined):
+        key = ROOM_NODES_KEY.format(namespace, room)
+        try:
+            if joined:
+                self.backend.add_room_node(key, self.host_id)
+            else:
+                self.backend.remove_room_node(key, self.host_id)
+        except Exception as e:
+            # Re-registered from self.rooms when the listener reconnects
+            self._get_logger().error(f'Cannot update room membership: {str(e)}')
+
+    def register_rooms(self):
+        for namespace, rooms in list(self.rooms.items()):
+            for room in list(rooms):
+                if room is not None and not self.is_sid_room(namespace, room):
+                    self.update_room_node(namespace, room, joined=True)
+
+    # Publishing
+
+    def target_nodes(self, message):
+        """Return (node ids, room keys) for an emit, or (None, None) when every node must get it."""
+        namespace = message.get('namespace') or '/'
+        rooms = message.get('room')
+        nodes = set()
+        keys = []
+        for room in rooms if isinstance(rooms, list) else [rooms]:
+            if room is None:
+                return None, None
+            if self.is_sid_room(namespace, room):
+                # One of our own clients, already handled locally
+                continue
+            key = ROOM_NODES_KEY.format(namespace, room)
+            room_nodes = self.backend.room_nodes(key)
+            if not room_nodes:
+                # Unknown room: most likely the sid of a client on another node
+                return None, None
+            nodes |= room_nodes
+            keys.append(key)
+        nodes.discard(self.host_id)
+        return nodes, keys
+
+    def _publish(self, data):
+        if data.get('method') == 'callback':
+            # Callbacks go back to the node that issued the emit
+            self.publish_to_node(data['host_id'], data)
+            return
+
+        nodes = None
+        if data.get('method') == 'emit':
+            try:
+                nodes, keys = self.target_nodes(data)
+            except Exception as e:
+                self._get_logger().error(f'Cannot look up room nodes, broadcasting: {str(e)}')
+        try:
+            if nodes is None:
+                self.backend.publish(self.channel, self.json.dumps(data))
+                return
+            for node_id in nodes:
+                if not self.publish_to_node(node_id, data):
+                    # Nobody listens on that node's channel any more
+                    for key in keys:
+                        self.backend.remove_room_node(key, node_id)
+        except Exception as e:
+            self._get_logger().error(f'Cannot publish to other nodes: {str(e)}')
+
+    def publish_to_node(self, node_id, data):
+        return self.backend.publish(NODE_CHANNEL.format(self.channel, node_id), self.json.dumps(data))
+
+    def _listen(self):
+        retry_sleep = 1
+        while True:
+            try:
+                listener = self.backend.listen([self.channel, self.node_channel])
+                # Memberships may have been lost while we were disconnected
+                self.register_rooms()
+                for data in listener:
+                    retry_sleep = 1
+                    yield data
+            except Exception as e:
+                self._get_logger().error(f'Cannot receive from other nodes, retrying in {retry_sleep}s: {str(e)}')
+                time.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, LISTEN_RETRY_MAX)